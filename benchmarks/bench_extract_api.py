@@ -0,0 +1,129 @@
+"""
+Load-test harness for the Wikidata extract.
+
+Runs ``extract_api``'s fetch engine against the local SPARQL stub
+(``benchmarks/sparql_stub.py``) with a given batch size, concurrency and
+fault profile, and reports artists per second, requests, retries and bytes
+transferred. The response cache is disabled so that every artist hits the
+stub.
+
+Usage:
+    python -m benchmarks.bench_extract_api --artists 5000 --batch-size 80 \
+        --concurrency 1 2 4 8 --latency 0.2 --throttle-rate 0.02
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.sparql_stub import StubState, load_fixture, start_stub_server
+from src.extract import extract_api
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+def run_benchmark(
+    artists: list,
+    state: StubState,
+    batch_size: int,
+    concurrency: int,
+    requests_per_second: float,
+    query_strategy: str = extract_api.QUERY_STRATEGY,
+    isolation: str = extract_api.ISOLATION_MODE
+) -> dict:
+    """
+    Extracts the given artists from a running stub and measures the run.
+
+    Args:
+        artists (list): Cleaned artist names to extract.
+        state (StubState): State of the stub server the endpoint points to.
+        batch_size (int): Preferred number of artists per request.
+        concurrency (int): Number of batches in flight.
+        requests_per_second (float): Client-side rate limit.
+        query_strategy (str): Name of the strategy in ``QUERY_STRATEGIES``.
+        isolation (str): Name of the mode in ``ISOLATION_MODES``.
+
+    Returns:
+        dict: Measurements of the run.
+    """
+    stats = {}
+    server_before = dict(state.counters)
+    start = time.perf_counter()
+    rows = sum(
+        len(batch_rows)
+        for _, batch_rows in extract_api._query_wikidata(
+            artists, concurrency, requests_per_second, cache_path=None,
+            query_strategy=query_strategy, isolation=isolation,
+            batch_size=batch_size, stats=stats
+        )
+    )
+    elapsed = time.perf_counter() - start
+    server = {key: state.counters[key] - server_before[key] for key in state.counters}
+
+    return {
+        "batch_size": batch_size,
+        "concurrency": concurrency,
+        "strategy": query_strategy,
+        "artists": len(artists),
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "artists_per_second": round(len(artists) / elapsed, 1) if elapsed else float("inf"),
+        "requests": stats.get("requests", 0),
+        "throttled": stats.get("throttled", 0),
+        "failed_requests": stats.get("failed_requests", 0),
+        "quarantined": stats.get("quarantined", 0),
+        "bytes_sent": server["bytes_in"],
+        "bytes_received": server["bytes_out"]
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure extract_api throughput against the SPARQL stub.")
+    parser.add_argument("--artists", type=int, default=2000, help="Number of fixture artists to extract.")
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[extract_api.BATCH_SIZE])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[extract_api.MAX_WORKERS])
+    parser.add_argument("--requests-per-second", type=float, default=1000.0)
+    parser.add_argument("--strategy", choices=sorted(extract_api.QUERY_STRATEGIES), default=extract_api.QUERY_STRATEGY)
+    parser.add_argument("--isolation", choices=sorted(extract_api.ISOLATION_MODES), default=extract_api.ISOLATION_MODE)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every response.")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Probability of an HTTP 429.")
+    parser.add_argument("--retry-after", type=float, default=0.2)
+    parser.add_argument("--max-query-bytes", type=int, default=None)
+    parser.add_argument("--poison", type=int, default=0, help="Number of names that always fail.")
+    args = parser.parse_args()
+
+    fixture = load_fixture()
+    artists = sorted(fixture)[:args.artists]
+    poison = set(artists[len(artists) // (args.poison + 1)::len(artists) // (args.poison + 1)][:args.poison]) \
+        if args.poison else set()
+
+    state = StubState(
+        fixture, args.latency, args.throttle_rate, args.retry_after, args.max_query_bytes, poison
+    )
+    server = start_stub_server(state)
+    extract_api.WIKIDATA_ENDPOINT = f"http://127.0.0.1:{server.server_port}/sparql"
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    results = []
+    try:
+        for batch_size in args.batch_size:
+            for concurrency in args.concurrency:
+                results.append(run_benchmark(
+                    artists, state, batch_size, concurrency, args.requests_per_second,
+                    args.strategy, args.isolation
+                ))
+    finally:
+        server.shutdown()
+
+    columns = list(results[0])
+    print(" | ".join(columns))
+    for result in results:
+        print(" | ".join(str(result[column]) for column in columns))
+
+
+if __name__ == "__main__":
+    main()
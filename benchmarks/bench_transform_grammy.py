@@ -0,0 +1,128 @@
+"""
+Benchmark of the artist imputation in ``transform_grammy``.
+
+Scales the Grammy dataset up by repeating its rows, then runs the
+row-by-row imputation the transform used to do (``DataFrame.apply`` with a
+``re.search`` per row, ``Series.apply`` with ``re.match``) and the
+vectorised ``str.extract`` version on the same input. Checks that both give
+the same output and reports the time of each and the speedup. Exits with a
+non-zero status if the outputs differ.
+
+Usage:
+    python -m benchmarks.bench_transform_grammy --scale 50 --runs 3
+"""
+
+import os
+import re
+import sys
+import time
+import logging
+import argparse
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.transform import transform_grammy
+
+GRAMMY_CSV = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'the_grammy_awards.csv')
+)
+
+
+def legacy_impute_artist_from_parenthesis(df: pd.DataFrame) -> pd.DataFrame:
+    """Row-by-row version of ``impute_artist_from_parenthesis``."""
+    def extract_from_parentheses(workers):
+        match = re.search(r'\((.*?)\)', str(workers))
+        return match.group(1) if match else None
+
+    df["artist"] = df.apply(
+        lambda row: extract_from_parentheses(row["workers"]) if pd.isna(row["artist"]) else row["artist"],
+        axis=1
+    )
+    return df.reset_index(drop=True)
+
+
+def legacy_impute_artist_from_roles(df: pd.DataFrame) -> pd.DataFrame:
+    """Row-by-row version of ``impute_artist_from_roles``."""
+    def extract_artist(workers):
+        if pd.isnull(workers):
+            return None
+        match = re.match(r"([^,;]+), (soloist|composer|conductor|artist)", workers)
+        if match:
+            return match.group(1).strip()
+        match = re.match(r"(.+?(Featuring|&| and ).*?)(;|,|$)", workers, re.IGNORECASE)
+        if match:
+            return match.group(1).strip()
+        return workers.strip()
+
+    df['artist'] = df['artist'].fillna(df['workers'].apply(extract_artist))
+    return df.reset_index(drop=True)
+
+
+STEPS = {
+    "impute_artist_from_parenthesis": (
+        legacy_impute_artist_from_parenthesis, transform_grammy.impute_artist_from_parenthesis
+    ),
+    "impute_artist_from_roles": (
+        legacy_impute_artist_from_roles, transform_grammy.impute_artist_from_roles
+    )
+}
+
+
+def load_scaled(scale: int, csv_path: str = GRAMMY_CSV) -> pd.DataFrame:
+    """
+    Builds the input of the imputation steps: the Grammy dataset repeated
+    ``scale`` times, after the steps that run before the imputation.
+
+    Args:
+        scale (int): Number of copies of the dataset.
+        csv_path (str): Grammy CSV.
+
+    Returns:
+        pd.DataFrame: Rows ready for ``impute_artist_from_parenthesis``.
+    """
+    df = pd.concat([pd.read_csv(csv_path)] * scale, ignore_index=True)
+    df = transform_grammy.drop_null_nominees(df)
+    df = transform_grammy.drop_nulls_in_nonessential_categories(df)
+    return transform_grammy.impute_artist_from_nominee(df)
+
+
+def time_step(step, df: pd.DataFrame, runs: int) -> tuple[pd.DataFrame, float]:
+    """Runs a step on copies of ``df`` and returns its output and best time in seconds."""
+    best = float("inf")
+    for _ in range(runs):
+        data = df.copy()
+        start = time.perf_counter()
+        out = step(data)
+        best = min(best, time.perf_counter() - start)
+    return out, best
+
+
+def main(argv: list | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Grammy artist imputation.")
+    parser.add_argument("--scale", type=int, default=50, help="copies of the Grammy dataset")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--csv", default=GRAMMY_CSV)
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    df = load_scaled(args.scale, args.csv)
+    print(f"{len(df)} rows ({args.scale}x), {df['artist'].isna().sum()} without artist")
+
+    failed = False
+    legacy_chain, vectorised_chain = df, df
+    for name, (legacy, vectorised) in STEPS.items():
+        expected, legacy_time = time_step(legacy, legacy_chain, args.runs)
+        result, vectorised_time = time_step(vectorised, vectorised_chain, args.runs)
+        equal = expected.equals(result)
+        failed |= not equal
+        print(f"{name}: legacy {legacy_time * 1000:.1f} ms, vectorised {vectorised_time * 1000:.1f} ms, "
+              f"speedup {legacy_time / vectorised_time:.1f}x, {'equal' if equal else 'DIFFERENT'}")
+        legacy_chain, vectorised_chain = expected, result
+
+    print("FAIL: outputs differ" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
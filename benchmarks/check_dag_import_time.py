@@ -0,0 +1,98 @@
+"""
+Import-time budget for the Airflow DAG file.
+
+Imports ``dag/dag_workshop.py`` in a fresh interpreter, the way the
+scheduler parses it, after Airflow itself has been imported, and measures
+what the DAG file adds on top: wall time and newly loaded modules. Exits
+with a non-zero status if the time exceeds the budget or if any heavy
+library (pandas, pyarrow, sqlalchemy, the Google clients, ...) is loaded at
+parse time. The best of several runs is kept to smooth out noise.
+
+Usage:
+    python -m benchmarks.check_dag_import_time --budget-ms 150 --runs 5
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DAG_FILE = os.path.join(REPO_ROOT, 'dag', 'dag_workshop.py')
+BUDGET_MS = 150.0
+HEAVY_MODULES = [
+    "pandas", "numpy", "pyarrow", "sqlalchemy", "psycopg2", "requests",
+    "langdetect", "tqdm", "googleapiclient", "google_auth_oauthlib", "google.oauth2"
+]
+
+# Runs in the child interpreter: import Airflow first (its own cost is not
+# ours to budget), then load the DAG file as the scheduler does.
+PROBE = """
+import sys, json, time, importlib.util
+import airflow
+from airflow import DAG
+from airflow.operators.python import PythonOperator
+before = set(sys.modules)
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location("dag_workshop", sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+elapsed = time.perf_counter() - start
+print(json.dumps({"ms": elapsed * 1000, "modules": sorted(set(sys.modules) - before)}))
+"""
+
+
+def probe_import(dag_file: str = DAG_FILE) -> dict:
+    """
+    Imports the DAG file in a new interpreter.
+
+    Args:
+        dag_file (str): Path of the DAG file.
+
+    Returns:
+        dict: Import time in milliseconds ('ms') and modules loaded by the
+              DAG file on top of Airflow ('modules').
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE, dag_file],
+        capture_output=True, text=True, check=True, cwd=REPO_ROOT
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def heavy_imports(modules: list) -> list:
+    """Returns the modules of ``HEAVY_MODULES`` (or their submodules) in a list."""
+    return sorted(
+        module for module in modules
+        if any(module == heavy or module.startswith(heavy + ".") for heavy in HEAVY_MODULES)
+    )
+
+
+def main(argv: list | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Check the parse-time budget of the DAG file.")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--dag-file", default=DAG_FILE)
+    args = parser.parse_args(argv)
+
+    probes = [probe_import(args.dag_file) for _ in range(args.runs)]
+    best = min(probes, key=lambda probe: probe["ms"])
+    heavy = heavy_imports(best["modules"])
+
+    print(f"DAG import: {best['ms']:.1f} ms (budget {args.budget_ms:.0f} ms), "
+          f"{len(best['modules'])} new modules")
+    failed = False
+    if best["ms"] > args.budget_ms:
+        print("FAIL: import time over budget")
+        failed = True
+    if heavy:
+        print(f"FAIL: heavy modules imported at parse time: {', '.join(heavy)}")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+"""
+Local stand-in for the Wikidata SPARQL endpoint.
+
+The server answers the queries built by ``src/extract/extract_api.py``
+(the combined ``build_sparql_query`` as well as the split attribute, award
+and album-count sub-queries) from a fixture of past results, using the
+``application/sparql-results+json`` format. Latency, throttling (HTTP 429
+with ``Retry-After``) and query size limits can be injected to reproduce
+the behaviour of the public endpoint offline.
+
+Usage:
+    python -m benchmarks.sparql_stub --port 8900 --latency 0.2 --throttle-rate 0.05
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.extract.extract_api import SEED_CSVS, _load_seed_results
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+NAME_PATTERN = re.compile(r'"((?:[^"\\]|\\.)*)"@en')
+
+
+def load_fixture(paths: list = SEED_CSVS) -> dict:
+    """
+    Loads the fixture dataset served by the stub.
+
+    Args:
+        paths (list): CSV files in the ``artist,country,award,gender,album_count`` layout.
+
+    Returns:
+        dict: Mapping of cleaned artist name to its list of result rows.
+    """
+    return _load_seed_results(paths)
+
+
+def _literal(value: str) -> dict:
+    """Wraps a value as a SPARQL JSON literal binding."""
+    return {"type": "literal", "value": value}
+
+
+def _combined_bindings(name: str, rows: list) -> list:
+    """Bindings for ``build_sparql_query``."""
+    bindings = []
+    for row in rows:
+        binding = {"name": _literal(name), "artistLabel": _literal(row["artist"])}
+        if row["country"]:
+            binding["countryLabel"] = _literal(row["country"])
+        if row["award"] != "No awards":
+            binding["awardLabel"] = _literal(row["award"])
+        if row["gender"] != "Unknown":
+            binding["genderLabel"] = _literal(row["gender"])
+        binding["album_count"] = _literal(row["album_count"] or "0")
+        bindings.append(binding)
+    return bindings
+
+
+def _attribute_bindings(name: str, rows: list) -> list:
+    """Bindings for ``build_attributes_query``."""
+    pairs = sorted({(row["country"], row["gender"]) for row in rows})
+    bindings = []
+    for country, gender in pairs:
+        binding = {"name": _literal(name)}
+        if country:
+            binding["countryLabel"] = _literal(country)
+        if gender != "Unknown":
+            binding["genderLabel"] = _literal(gender)
+        bindings.append(binding)
+    return bindings
+
+
+def _award_bindings(name: str, rows: list) -> list:
+    """Bindings for ``build_awards_query``."""
+    awards = sorted({row["award"] for row in rows if row["award"] != "No awards"})
+    return [{"name": _literal(name), "awardLabel": _literal(award)} for award in awards]
+
+
+def _album_bindings(name: str, rows: list) -> list:
+    """Bindings for ``build_album_count_query``."""
+    count = max(int(row["album_count"] or 0) for row in rows)
+    return [{"name": _literal(name), "album_count": _literal(str(count))}] if count else []
+
+
+def answer_query(query: str, fixture: dict) -> list:
+    """
+    Answers one SPARQL query from the fixture.
+
+    Args:
+        query (str): Query text produced by one of the ``extract_api`` builders.
+        fixture (dict): Mapping of artist name to its list of result rows.
+
+    Returns:
+        list: The ``results.bindings`` of the response.
+    """
+    if "COUNT(DISTINCT ?album)" in query:
+        build = _album_bindings
+    elif "?awardLabel WHERE" in query:
+        build = _award_bindings
+    elif "?countryLabel ?genderLabel WHERE" in query:
+        build = _attribute_bindings
+    else:
+        build = _combined_bindings
+
+    bindings = []
+    for raw_name in NAME_PATTERN.findall(query):
+        name = raw_name.replace('\\"', '"')
+        if fixture.get(name):
+            bindings.extend(build(name, fixture[name]))
+    return bindings
+
+
+class StubState:
+    """
+    Configuration and counters shared by the request handlers.
+
+    Args:
+        fixture (dict): Mapping of artist name to its list of result rows.
+        latency (float): Seconds added to every response.
+        throttle_rate (float): Probability of answering HTTP 429.
+        retry_after (float): Value of the ``Retry-After`` header on 429 answers.
+        max_query_bytes (int, optional): Larger queries are rejected with HTTP 500,
+                                         like a timed-out query on the real endpoint.
+        poison_names (set, optional): Names that make any query containing them fail.
+        seed (int): Seed for the throttling draws.
+        outage_status (int, optional): Status answered to every request, to
+                                       simulate an endpoint outage.
+    """
+
+    def __init__(
+        self,
+        fixture: dict,
+        latency: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: float = 1.0,
+        max_query_bytes: int | None = None,
+        poison_names: set | None = None,
+        seed: int = 0,
+        outage_status: int | None = None
+    ):
+        self.fixture = fixture
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.max_query_bytes = max_query_bytes
+        self.poison_names = poison_names or set()
+        self.random = random.Random(seed)
+        self.outage_status = outage_status
+        self.lock = threading.Lock()
+        self.counters = {"requests": 0, "throttled": 0, "rejected": 0, "bytes_in": 0, "bytes_out": 0}
+
+    def count(self, **deltas) -> None:
+        """Adds to the server counters."""
+        with self.lock:
+            for key, value in deltas.items():
+                self.counters[key] += value
+
+    def should_throttle(self) -> bool:
+        """Draws whether the current request is throttled."""
+        with self.lock:
+            return self.random.random() < self.throttle_rate
+
+
+class SparqlStubHandler(BaseHTTPRequestHandler):
+    """Handles ``POST /sparql`` requests with a ``query`` form field."""
+
+    state: StubState = None
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        self.state.count(requests=1, bytes_in=len(body))
+        query = parse_qs(body.decode("utf-8")).get("query", [""])[0]
+
+        if self.state.latency:
+            time.sleep(self.state.latency)
+
+        if self.state.outage_status:
+            self.state.count(rejected=1)
+            self._send(self.state.outage_status, b"Service Unavailable")
+            return
+
+        if self.state.should_throttle():
+            self.state.count(throttled=1)
+            self._send(429, b"Too Many Requests", {"Retry-After": str(self.state.retry_after)})
+            return
+
+        too_large = self.state.max_query_bytes and len(query.encode("utf-8")) > self.state.max_query_bytes
+        poisoned = any(f'"{name}"@en' in query for name in self.state.poison_names)
+        if too_large or poisoned:
+            self.state.count(rejected=1)
+            self._send(500, b"java.util.concurrent.TimeoutException")
+            return
+
+        payload = {
+            "head": {"vars": []},
+            "results": {"bindings": answer_query(query, self.state.fixture)}
+        }
+        self._send(200, json.dumps(payload).encode("utf-8"),
+                   {"Content-Type": "application/sparql-results+json"})
+
+    def _send(self, status: int, body: bytes, headers: dict | None = None) -> None:
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.state.count(bytes_out=len(body))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(state: StubState, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """
+    Starts the stub server in a background thread.
+
+    Args:
+        state (StubState): Fixture, fault injection settings and counters.
+        host (str): Interface to bind.
+        port (int): Port to bind, 0 picks a free one.
+
+    Returns:
+        ThreadingHTTPServer: The running server; its endpoint URL is
+                             ``http://{host}:{server.server_port}/sparql``.
+    """
+    handler = type("BoundSparqlStubHandler", (SparqlStubHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local stand-in for the Wikidata SPARQL endpoint.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--max-query-bytes", type=int, default=None)
+    args = parser.parse_args()
+
+    state = StubState(
+        load_fixture(), args.latency, args.throttle_rate, args.retry_after, args.max_query_bytes
+    )
+    server = start_stub_server(state, args.host, args.port)
+    logging.info(f"SPARQL stub listening on http://{args.host}:{server.server_port}/sparql")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,24 @@
 import os
+import re
 import sys
+import json
+import time
+import shutil
 import logging
+import functools
 from datetime import datetime
 from airflow import DAG
 from airflow.operators.python import PythonOperator
-import pandas as pd
 
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.extract.extract_api import extract_api
-from src.extract.extract_grammy import extract_data as extract_grammy
-from src.extract.extract_spotify import extract_spotify_data
-
-from src.transform.transform_api import transformation_api
-from src.transform.transform_grammy import transform_grammy_data
-from src.transform.transform_spotify import transform_spotify_data
-
-from src.transform.merge import merge_datasets
-from src.load.load import load_to_postgresql
-from src.load.store import upload_file_to_drive
+# The scheduler re-parses this file continuously, so only the task graph is
+# built at import time: pandas, pyarrow and the src modules (and through them
+# sqlalchemy, requests, langdetect and the Google clients) are imported inside
+# the task callables. benchmarks/check_dag_import_time.py enforces this.
 
 
 default_args = {
@@ -35,6 +32,7 @@ dag = DAG(
     default_args=default_args,
     schedule_interval='@daily',
     catchup=False,
+    max_active_runs=int(os.environ.get('ETL_MAX_ACTIVE_RUNS', '4')),
     description='ETL completo para datos de artistas (Spotify, Grammy, API Wikidata)'
 )
 
@@ -42,81 +40,239 @@ dag = DAG(
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 DATA_TEMP_DIR = os.path.join(BASE_DIR, 'data_temp')
 os.makedirs(DATA_TEMP_DIR, exist_ok=True)
+# Working directories of finished runs that did not clean up after
+# themselves (failed runs) are removed after this many days.
+RUN_DIR_RETENTION_DAYS = 7
+
+
+def run_dir_name(run_id: str) -> str:
+    """Returns the name of the working directory of a DAG run."""
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', run_id)
+
+
+def run_paths(context: dict) -> dict:
+    """
+    Builds the paths of the intermediate artifacts of a DAG run. Each run
+    works in its own directory under DATA_TEMP_DIR, so concurrent runs and
+    backfills do not overwrite each other's files.
+
+    Args:
+        context (dict): Airflow task context.
+
+    Returns:
+        dict: Artifact paths keyed by name, plus the run directory ('dir').
+    """
+    from src.storage import artifact_path
+
+    run_dir = os.path.join(DATA_TEMP_DIR, run_dir_name(context['run_id']))
+    os.makedirs(run_dir, exist_ok=True)
+    return {
+        'dir': run_dir,
+        'spotify_raw': artifact_path(run_dir, 'spotify_raw'),
+        'spotify': artifact_path(run_dir, 'spotify'),
+        'grammy_changes': artifact_path(run_dir, 'grammy_changes'),
+        'grammy': artifact_path(run_dir, 'grammy'),
+        'grammy_watermark': os.path.join(run_dir, 'grammy_watermark.json'),
+        'api_raw': artifact_path(run_dir, 'api_raw'),
+        'api': artifact_path(run_dir, 'api'),
+        'api_parts': os.path.join(run_dir, 'api_parts'),
+        'merged': artifact_path(run_dir, 'merged'),
+        'merged_csv': os.path.join(run_dir, 'merged.csv')
+    }
+
+
+def instrumented(task):
+    """Wraps a task with the telemetry of src.telemetry, loaded when the task runs."""
+    @functools.wraps(task)
+    def run(**context):
+        from src.telemetry import instrument_task
+        return instrument_task(task)(**context)
+    return run
+
+
+def task_extract_spotify(**context):
+    from src import pipeline
+    from src.extract import extract_spotify
+    from src.stage_cache import run_cached, stage_key, file_fingerprint, code_fingerprint
+    from src.storage import write_frame, write_frames
+
+    paths = run_paths(context)
+
+    def extract():
+        if pipeline.SPOTIFY_CHUNKSIZE:
+            write_frames(pipeline.extract_spotify_chunks(pipeline.SPOTIFY_CHUNKSIZE), paths['spotify_raw'])
+        else:
+            write_frame(pipeline.extract_spotify(), paths['spotify_raw'])
+
+    # The chunked and in-memory extracts write different artifacts (the
+    # chunks carry their own 'track_genre' categories), so the mode is part
+    # of the key, and so is the code of pipeline.extract_spotify_chunks.
+    key = stage_key(
+        file_fingerprint(extract_spotify.SPOTIFY_CSV),
+        pipeline.SPOTIFY_CHUNKSIZE or "in-memory",
+        code_fingerprint(extract_spotify, pipeline)
+    )
+    run_cached('extract_spotify', key, [paths['spotify_raw']], extract)
+    logging.info(f"Spotify extraído en {paths['spotify_raw']}")
+
+def task_extract_grammy(**context):
+    from src import pipeline
+    from src.storage import write_frame
+
+    # Not stage-cached: the watermark already limits the query to the rows
+    # changed since the last run.
+    paths = run_paths(context)
+    since = pipeline.grammy_since()
+    df, watermark = pipeline.extract_grammy(since)
+    write_frame(df, paths['grammy_changes'])
+    with open(paths['grammy_watermark'], 'w', encoding='utf-8') as file:
+        json.dump({'since': since, 'updated_at': watermark}, file)
+    logging.info(f"{len(df)} filas nuevas o modificadas en Grammy, extraídas en {paths['grammy_changes']}")
+
+def task_extract_api(**context):
+    from src import pipeline
+    from src.extract.extract_api import WIKIDATA_OFFLINE, read_api_parts
+    from src.storage import write_frames
+
+    paths = run_paths(context)
+    if WIKIDATA_OFFLINE:
+        logging.info("Modo sin conexión: solo se usan la caché de Wikidata y los archivos semilla")
+    pipeline.extract_api_parts(paths['api_parts'], offline=WIKIDATA_OFFLINE)
+    write_frames(read_api_parts(paths['api_parts']), paths['api_raw'])
+    logging.info(f"API extraído en {paths['api_raw']}")
 
-SPOTIFY_PATH = os.path.join(DATA_TEMP_DIR, 'spotify.csv')
-GRAMMY_PATH = os.path.join(DATA_TEMP_DIR, 'grammy.csv')
-API_PATH = os.path.join(DATA_TEMP_DIR, 'api.csv')
-MERGED_PATH = os.path.join(DATA_TEMP_DIR, 'merged.csv')
-
-
-def task_extract_spotify():
-    df = extract_spotify_data()
-    if df.empty:
-        raise ValueError("El DataFrame de Spotify está vacío.")
-    df.to_csv(SPOTIFY_PATH, index=False)
-    logging.info(f"Spotify extraído en {SPOTIFY_PATH}")
-
-def task_extract_grammy():
-    df = extract_grammy()
-    if df.empty:
-        raise ValueError("El DataFrame de Grammy está vacío.")
-    df.to_csv(GRAMMY_PATH, index=False)
-    logging.info(f"Grammy extraído en {GRAMMY_PATH}")
-
-def task_extract_api():
-    df = extract_api()
-    if df.empty:
-        raise ValueError("El DataFrame de Wikidata está vacío.")
-    df.to_csv(API_PATH, index=False)
-    logging.info(f"API extraído en {API_PATH}")
-
-def task_transform_spotify():
-    df = pd.read_csv(SPOTIFY_PATH)
-    df_clean = transform_spotify_data(df)
-    df_clean.to_csv(SPOTIFY_PATH, index=False)
-    logging.info(f"Spotify transformado en {SPOTIFY_PATH}")
-
-def task_transform_grammy():
-    df = pd.read_csv(GRAMMY_PATH)
-    df_clean = transform_grammy_data(df)
-    df_clean.to_csv(GRAMMY_PATH, index=False)
-    logging.info(f"Grammy transformado en {GRAMMY_PATH}")
-
-def task_transform_api():
-    df = pd.read_csv(API_PATH)
-    df_clean = transformation_api(df)
-    df_clean.to_csv(API_PATH, index=False)
-    logging.info(f"API transformado en {API_PATH}")
-
-def task_merge():
-    df_spotify = pd.read_csv(SPOTIFY_PATH)
-    df_grammy = pd.read_csv(GRAMMY_PATH)
-    df_api = pd.read_csv(API_PATH)
-    df_merged = merge_datasets(df_spotify, df_grammy, df_api)
-    df_merged.to_csv(MERGED_PATH, index=False)
-    logging.info(f"Datos combinados en {MERGED_PATH}")
-
-def task_load():
-    df = pd.read_csv(MERGED_PATH)
-    load_to_postgresql(df, "data_pipeline")
+def task_transform_spotify(**context):
+    from src import pipeline
+    from src.transform import transform_spotify, transform_spotify_chunked
+    from src.stage_cache import run_cached, stage_key, file_fingerprint, code_fingerprint
+    from src.storage import iter_frames, read_frame, write_frame
+
+    paths = run_paths(context)
+
+    def transform():
+        chunksize = pipeline.SPOTIFY_CHUNKSIZE
+        if chunksize:
+            pipeline.transform_spotify_chunked(iter_frames(paths['spotify_raw'], chunksize), paths['spotify'], paths['dir'])
+        else:
+            write_frame(pipeline.transform_spotify(read_frame(paths['spotify_raw'])), paths['spotify'])
+
+    key = stage_key(file_fingerprint(paths['spotify_raw']), code_fingerprint(transform_spotify, transform_spotify_chunked))
+    run_cached('transform_spotify', key, [paths['spotify']], transform)
+    logging.info(f"Spotify transformado en {paths['spotify']}")
+
+def task_transform_grammy(**context):
+    from src import pipeline
+    from src.extract.extract_grammy import save_watermark
+    from src.storage import read_frame, write_frame
+
+    paths = run_paths(context)
+    with open(paths['grammy_watermark'], 'r', encoding='utf-8') as file:
+        extracted = json.load(file)
+
+    # The transformed store and its watermark are shared by every run. The
+    # store is the cache of this stage: only the changed rows are transformed.
+    # If another run updated the store after this run's extract, its changes
+    # may be older than the store, so they are extracted again under the lock.
+    with pipeline.grammy_store_lock():
+        since = pipeline.grammy_since()
+        if since == extracted['since']:
+            df_changes, watermark = read_frame(paths['grammy_changes']), extracted['updated_at']
+        else:
+            logging.info(f"Otra ejecución actualizó Grammy; se vuelven a extraer los cambios desde {since}")
+            df_changes, watermark = pipeline.extract_grammy(since)
+        write_frame(pipeline.transform_grammy(df_changes), paths['grammy'])
+        save_watermark(watermark)
+    logging.info(f"Grammy transformado en {paths['grammy']}")
+
+def task_transform_api(**context):
+    from src import pipeline
+    from src.transform import transform_api, language_cache
+    from src.stage_cache import run_cached, stage_key, file_fingerprint, code_fingerprint
+    from src.storage import read_frame, write_frame
+
+    paths = run_paths(context)
+
+    def transform():
+        write_frame(pipeline.transform_api(read_frame(paths['api_raw'])), paths['api'])
+
+    key = stage_key(file_fingerprint(paths['api_raw']), code_fingerprint(transform_api, language_cache))
+    run_cached('transform_api', key, [paths['api']], transform)
+    logging.info(f"API transformado en {paths['api']}")
+
+def task_merge(**context):
+    from src import pipeline
+    from src.transform import merge as merge_module
+    from src.stage_cache import run_cached, stage_key, file_fingerprint, code_fingerprint
+    from src.storage import read_frame, write_frame
+
+    paths = run_paths(context)
+
+    def merge():
+        df_merged = pipeline.merge(
+            read_frame(paths['spotify']),
+            read_frame(paths['grammy']),
+            read_frame(paths['api'])
+        )
+        write_frame(df_merged, paths['merged'])
+
+    key = stage_key(
+        file_fingerprint(paths['spotify']),
+        file_fingerprint(paths['grammy']),
+        file_fingerprint(paths['api']),
+        code_fingerprint(merge_module)
+    )
+    run_cached('merge_datasets', key, [paths['merged']], merge)
+    logging.info(f"Datos combinados en {paths['merged']}")
+
+def task_load(**context):
+    from src import pipeline
+    from src.storage import read_frame
+
+    paths = run_paths(context)
+    pipeline.load(read_frame(paths['merged']), context['run_id'])
     logging.info("Datos cargados exitosamente a la base de datos")
 
-def task_store_to_drive():
-    upload_file_to_drive(MERGED_PATH, filename="artistas_merge.csv")
+def task_store_to_drive(**context):
+    from src.load.store import upload_file_to_drive
+    from src.storage import export_csv
+
+    paths = run_paths(context)
+    export_csv(paths['merged'], paths['merged_csv'])
+    upload_file_to_drive(paths['merged_csv'], filename="artistas_merge.csv")
     logging.info("Archivo subido a Google Drive desde DAG")
 
+def task_cleanup(**context):
+    from airflow.models import DagRun
+    from airflow.utils.state import DagRunState
+
+    paths = run_paths(context)
+    shutil.rmtree(paths['dir'], ignore_errors=True)
+
+    # Directories of running or queued runs are kept whatever their age.
+    finished = {
+        run_dir_name(run.run_id)
+        for state in (DagRunState.SUCCESS, DagRunState.FAILED)
+        for run in DagRun.find(dag_id=dag.dag_id, state=state)
+    }
+    cutoff = time.time() - RUN_DIR_RETENTION_DAYS * 86400
+    for entry in os.scandir(DATA_TEMP_DIR):
+        if entry.is_dir() and entry.name in finished and entry.stat().st_mtime < cutoff:
+            shutil.rmtree(entry.path, ignore_errors=True)
+    logging.info(f"Directorio de trabajo {paths['dir']} eliminado")
+
 
-extract_spotify_op = PythonOperator(task_id='extract_spotify', python_callable=task_extract_spotify, dag=dag)
-extract_grammy_op = PythonOperator(task_id='extract_grammy', python_callable=task_extract_grammy, dag=dag)
-extract_api_op = PythonOperator(task_id='extract_api', python_callable=task_extract_api, dag=dag)
+extract_spotify_op = PythonOperator(task_id='extract_spotify', python_callable=instrumented(task_extract_spotify), dag=dag)
+extract_grammy_op = PythonOperator(task_id='extract_grammy', python_callable=instrumented(task_extract_grammy), dag=dag)
+extract_api_op = PythonOperator(task_id='extract_api', python_callable=instrumented(task_extract_api), dag=dag)
 
-transform_spotify_op = PythonOperator(task_id='transform_spotify', python_callable=task_transform_spotify, dag=dag)
-transform_grammy_op = PythonOperator(task_id='transform_grammy', python_callable=task_transform_grammy, dag=dag)
-transform_api_op = PythonOperator(task_id='transform_api', python_callable=task_transform_api, dag=dag)
+transform_spotify_op = PythonOperator(task_id='transform_spotify', python_callable=instrumented(task_transform_spotify), dag=dag)
+transform_grammy_op = PythonOperator(task_id='transform_grammy', python_callable=instrumented(task_transform_grammy), dag=dag)
+transform_api_op = PythonOperator(task_id='transform_api', python_callable=instrumented(task_transform_api), dag=dag)
 
-merge_op = PythonOperator(task_id='merge_datasets', python_callable=task_merge, dag=dag)
-load_op = PythonOperator(task_id='load_to_postgres', python_callable=task_load, dag=dag)
-store_op = PythonOperator(task_id='store_to_drive', python_callable=task_store_to_drive, dag=dag)
+merge_op = PythonOperator(task_id='merge_datasets', python_callable=instrumented(task_merge), dag=dag)
+load_op = PythonOperator(task_id='load_to_postgres', python_callable=instrumented(task_load), dag=dag)
+store_op = PythonOperator(task_id='store_to_drive', python_callable=instrumented(task_store_to_drive), dag=dag)
+cleanup_op = PythonOperator(task_id='cleanup_run', python_callable=instrumented(task_cleanup), dag=dag)
 
 
 
@@ -126,4 +282,4 @@ extract_api_op >> transform_api_op
 
 [transform_spotify_op, transform_grammy_op, transform_api_op] >> merge_op >> load_op
 
-load_op >> store_op
+load_op >> store_op >> cleanup_op
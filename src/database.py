@@ -0,0 +1,142 @@
+""" Shared database access for the extract and load steps. """
+
+import os
+import json
+import logging
+import threading
+from typing import Dict, Any
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+log = logging.getLogger(__name__)
+
+BASE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Source database, read by the extract.
+CREDENTIALS_ENV = "WORKSHOP_CREDENTIALS"
+CREDENTIALS_FILE = os.path.join(BASE_PATH, 'credentials.json')
+# Target database of the load. It never falls back to the source
+# credentials, so the load cannot write into the source database.
+LOAD_CREDENTIALS_ENV = "WORKSHOP_LOAD_CREDENTIALS"
+LOAD_CREDENTIALS_FILE = os.path.join(BASE_PATH, 'credentialsdb.json')
+
+POOL_OPTIONS = {
+    "pool_size": 5,
+    "max_overflow": 5,
+    "pool_pre_ping": True,
+    "pool_recycle": 1800
+}
+
+_engines: Dict[tuple, Engine] = {}
+_engines_lock = threading.Lock()
+
+
+def resolve_credentials_path(path: str | None = None, load: bool = False) -> str:
+    """
+    Finds the database credentials file without depending on the current
+    working directory.
+
+    The lookup order is the explicit ``path``, the ``WORKSHOP_CREDENTIALS``
+    environment variable and then 'credentials.json' at the repository root.
+    For the load, only the ``WORKSHOP_LOAD_CREDENTIALS`` environment variable
+    and 'credentialsdb.json' are tried.
+
+    Args:
+        path (str, optional): Explicit location of the credentials file.
+        load (bool): Whether the credentials are for the load target.
+
+    Returns:
+        str: Absolute path of the credentials file.
+
+    Raises:
+        FileNotFoundError: If none of the candidate files exists.
+    """
+    if path:
+        candidates = [path]
+    elif load:
+        candidates = [os.environ.get(LOAD_CREDENTIALS_ENV), LOAD_CREDENTIALS_FILE]
+    else:
+        candidates = [os.environ.get(CREDENTIALS_ENV), CREDENTIALS_FILE]
+    for candidate in candidates:
+        if candidate and os.path.exists(candidate):
+            return os.path.abspath(candidate)
+    raise FileNotFoundError(f"Credentials file not found, tried: {[c for c in candidates if c]}")
+
+
+def load_credentials(path: str | None = None, load: bool = False) -> Dict[str, Any]:
+    """
+    Reads the database credentials.
+
+    Args:
+        path (str, optional): Explicit location of the credentials file.
+        load (bool): Read the credentials of the load target instead of the
+                     source database (see ``resolve_credentials_path``).
+
+    Returns:
+        dict: Credentials with the 'db_host', 'db_name', 'db_user' and
+              'db_password' keys, and optionally 'db_port'.
+
+    Raises:
+        FileNotFoundError: If the credentials file is missing.
+        KeyError: If any expected key is missing in the credentials JSON.
+    """
+    with open(resolve_credentials_path(path, load), "r", encoding="utf-8") as file:
+        credentials: Dict[str, Any] = json.load(file)
+
+    missing = [key for key in ("db_host", "db_name", "db_user", "db_password") if key not in credentials]
+    if missing:
+        raise KeyError(f"Missing key in credentials file: {missing}")
+    return credentials
+
+
+def build_dsn(credentials: Dict[str, Any]) -> str:
+    """
+    Builds the SQLAlchemy PostgreSQL connection string.
+
+    Args:
+        credentials (dict): Credentials as returned by ``load_credentials``.
+
+    Returns:
+        str: PostgreSQL connection string.
+    """
+    return (
+        f"postgresql://{credentials['db_user']}:{credentials['db_password']}"
+        f"@{credentials['db_host']}:{credentials.get('db_port', 5432)}/{credentials['db_name']}"
+    )
+
+
+def get_engine(dsn: str | None = None, **pool_options) -> Engine:
+    """
+    Returns the engine for a DSN, creating it on first use.
+
+    Engines are cached per DSN and pool configuration for the lifetime of
+    the process, so the connection pool is shared by every task that runs
+    in the same worker.
+
+    Args:
+        dsn (str, optional): Connection string, built from the credentials file if omitted.
+        **pool_options: Overrides for ``POOL_OPTIONS`` (pool_size, max_overflow,
+                        pool_pre_ping, pool_recycle, ...).
+
+    Returns:
+        sqlalchemy.engine.Engine: Pooled engine.
+    """
+    dsn = dsn or build_dsn(load_credentials())
+    options = {**POOL_OPTIONS, **pool_options}
+    key = (dsn, tuple(sorted(options.items())))
+
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = create_engine(dsn, **options)
+            _engines[key] = engine
+            log.info(f"Created database engine for {engine.url.host}/{engine.url.database}")
+    return engine
+
+
+def dispose_engines() -> None:
+    """Closes every pooled connection and forgets the cached engines."""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
@@ -1,12 +1,27 @@
 import os
+import json
+import glob
 import time
+import hashlib
 import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
 import pandas as pd
 import requests
 from tqdm import tqdm
 
+from src.extract.wikidata_cache import (
+    CACHE_PATH, CACHE_TTL_DAYS, open_cache, get_cached, get_fresh_names, put_cached, evict,
+    seed_cached, seeds_evicted, is_seeded, mark_seeded, get_quarantined, quarantine, release_quarantine
+)
+
 # Constants
-WIKIDATA_ENDPOINT = "https://query.wikidata.org/sparql"
+WIKIDATA_ENDPOINT = os.environ.get("WIKIDATA_ENDPOINT", "https://query.wikidata.org/sparql")
+# Serve the artists from the local cache and seed files only, without
+# network access (e.g. ETL_WIKIDATA_OFFLINE=1).
+WIKIDATA_OFFLINE = os.environ.get("ETL_WIKIDATA_OFFLINE", "").lower() in ("1", "true", "yes")
 HEADERS = {
     "Accept": "application/sparql-results+json",
     "User-Agent": "Workshop/1.0 (ejemplo@gmail.com)"
@@ -14,25 +29,190 @@ HEADERS = {
 ARTISTS_CSV = os.path.abspath(
     os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'artists.csv')
 )
+SEED_CSVS = [
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'data', name))
+    for name in ('api_data_part1.csv', 'api_data_part2.csv')
+]
 MAX_QUERY_SIZE = 60000
+BATCH_SIZE = 80
+SPAN_SIZE = 2000
+MAX_WORKERS = 4
+REQUESTS_PER_SECOND = 1.25
+MAX_RETRIES = 5
+BACKOFF_SECONDS = 2.0
+RETRY_STATUS_CODES = (429, 503)
+QUERY_STRATEGY = "combined"
+# Query that every healthy endpoint answers, used to check it after failures.
+PROBE_QUERY = "ASK {}"
+ISOLATION_MODE = "bisect"
+ORDERED_COLUMNS = ["artist", "country", "award", "gender", "album_count"]
+CHECKPOINT_FILE = "_checkpoint.json"
 
 # Logging configuration
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 
-def extract_api() -> pd.DataFrame:
+def extract_api(**options) -> pd.DataFrame:
     """
     Extracts artist data from Wikidata using SPARQL queries and 
     returns the results as a pandas DataFrame.
 
+    Args:
+        **options: Extraction options, see ``iter_api_batches``.
+
     Returns:
         pd.DataFrame: A DataFrame containing columns 
                       ['artist', 'country', 'award', 'gender', 'album_count'].
     """
+    results = [row for _, rows in _iter_api_rows(**options) for row in rows]
+    return pd.DataFrame(results, columns=ORDERED_COLUMNS)
+
+
+def iter_api_batches(start_index: int = 0, **options):
+    """
+    Extracts artist data from Wikidata as a stream of per-batch DataFrames,
+    in the order of the sorted artist list.
+
+    Artists with a fresh entry in the on-disk response cache are not queried
+    again; only missing or expired ones go to the endpoint. On a cold cache,
+    the previously extracted ``api_data_part*.csv`` files are bulk-loaded
+    first so that only artists absent from them are queried.
+
+    Args:
+        start_index (int): Position in the sorted artist list to start from.
+        **options: Any of
+            max_workers (int): Maximum number of batches in flight at the same time.
+            requests_per_second (float): Sustained request rate allowed against the endpoint.
+            cache_path (str, optional): SQLite response cache, ``None`` disables caching.
+            cache_ttl_days (float, optional): Age after which cached artists are re-queried.
+            seed_paths (list, optional): CSV files with past results used to warm the cache.
+            offline (bool): If True, never contact Wikidata and return only the
+                            artists available locally (cache and seed files).
+                            Defaults to ``WIKIDATA_OFFLINE``.
+            query_strategy (str): ``"combined"`` sends the single grouped query from
+                                  ``build_sparql_query``; ``"split"`` sends narrower
+                                  attribute, award and album-count sub-queries.
+            isolation (str): How a failing batch is narrowed down, ``"bisect"``
+                             or ``"shrink"`` (see ``_fetch_batch``).
+            batch_size (int): Preferred number of artists per SPARQL request.
+            stats (dict, optional): Filled with request and failure counters.
+
+    Yields:
+        tuple: ``(next_index, frame)`` where ``next_index`` is the position of the
+               first artist not covered yet and ``frame`` holds the rows of the batch.
+    """
+    for next_index, rows in _iter_api_rows(start_index, **options):
+        yield next_index, pd.DataFrame(rows, columns=ORDERED_COLUMNS)
+
+
+def _iter_api_rows(
+    start_index: int = 0,
+    max_workers: int = MAX_WORKERS,
+    requests_per_second: float = REQUESTS_PER_SECOND,
+    cache_path: str | None = CACHE_PATH,
+    cache_ttl_days: float | None = CACHE_TTL_DAYS,
+    seed_paths: list | None = SEED_CSVS,
+    offline: bool = WIKIDATA_OFFLINE,
+    query_strategy: str = QUERY_STRATEGY,
+    isolation: str = ISOLATION_MODE,
+    batch_size: int = BATCH_SIZE,
+    stats: dict | None = None
+):
+    """Row-level implementation of ``iter_api_batches``."""
     unique_artists = _load_and_clean_artists(ARTISTS_CSV)
-    results = _query_wikidata(unique_artists)
-    ordered_columns = ["artist", "country", "award", "gender", "album_count"]
-    return pd.DataFrame(results, columns=ordered_columns)
+    if seed_paths and cache_path:
+        _seed_cache(cache_path, seed_paths)
+
+    seeded = None
+    if offline and not cache_path:
+        if not seed_paths:
+            raise ValueError("Offline mode needs either a cache or seed files.")
+        seeded = _load_seed_results(seed_paths)
+
+    yield from _query_wikidata(
+        unique_artists, max_workers, requests_per_second, cache_path, cache_ttl_days,
+        offline, query_strategy, start_index, seeded, isolation, batch_size, stats
+    )
+
+
+def extract_api_to_parquet(output_dir: str, **options) -> int:
+    """
+    Streams the Wikidata extraction into a directory of Parquet part files,
+    checkpointing the next artist index after every batch.
+
+    If the directory holds the checkpoint of an unfinished run over the same
+    artist list, the extraction resumes from it; otherwise it starts over.
+    Only one batch is kept in memory at a time.
+
+    Args:
+        output_dir (str): Directory for the part files and the checkpoint.
+        **options: Extraction options, see ``iter_api_batches``.
+
+    Returns:
+        int: Total number of rows written across all the parts.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint_path = os.path.join(output_dir, CHECKPOINT_FILE)
+    unique_artists = _load_and_clean_artists(ARTISTS_CSV)
+    fingerprint = hashlib.sha256(
+        "\n".join([options.get("query_strategy", QUERY_STRATEGY), *unique_artists]).encode("utf-8")
+    ).hexdigest()
+
+    checkpoint = {"fingerprint": fingerprint, "next_index": 0, "rows": 0, "complete": False}
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path, "r", encoding="utf-8") as file:
+            previous = json.load(file)
+        if previous.get("fingerprint") == fingerprint and not previous.get("complete"):
+            checkpoint = previous
+            logging.info(f"↩️ Resuming Wikidata extraction at artist {checkpoint['next_index']}")
+
+    for part in _list_parts(output_dir):
+        if _part_start(part) >= checkpoint["next_index"]:
+            os.remove(part)
+
+    start = checkpoint["next_index"]
+    for next_index, frame in iter_api_batches(start, **options):
+        if not frame.empty:
+            frame.to_parquet(os.path.join(output_dir, f"part-{start:07d}.parquet"), index=False)
+        checkpoint.update(next_index=next_index, rows=checkpoint["rows"] + len(frame))
+        _write_checkpoint(checkpoint_path, checkpoint)
+        start = next_index
+
+    checkpoint["complete"] = True
+    _write_checkpoint(checkpoint_path, checkpoint)
+    return checkpoint["rows"]
+
+
+def read_api_parts(output_dir: str):
+    """
+    Reads back the part files written by ``extract_api_to_parquet`` in order.
+
+    Args:
+        output_dir (str): Directory with the part files.
+
+    Yields:
+        pd.DataFrame: One frame per part file.
+    """
+    for part in _list_parts(output_dir):
+        yield pd.read_parquet(part)
+
+
+def _list_parts(output_dir: str) -> list:
+    """Returns the part files of an output directory sorted by start index."""
+    return sorted(glob.glob(os.path.join(output_dir, "part-*.parquet")), key=_part_start)
+
+
+def _part_start(path: str) -> int:
+    """Returns the artist index a part file starts at."""
+    return int(os.path.basename(path)[len("part-"):-len(".parquet")])
+
+
+def _write_checkpoint(path: str, checkpoint: dict) -> None:
+    """Atomically replaces the checkpoint file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(checkpoint, file)
+    os.replace(tmp_path, path)
 
 
 def clean_name(name: str) -> str:
@@ -70,6 +250,57 @@ def _load_and_clean_artists(csv_path: str) -> list:
     return unique_artists
 
 
+def _load_seed_results(seed_paths: list) -> dict:
+    """
+    Reads previously extracted results from CSV files in the
+    ``artist,country,award,gender,album_count`` layout.
+
+    Args:
+        seed_paths (list): Paths of the seed CSV files. Missing files are ignored.
+
+    Returns:
+        dict: Mapping of cleaned artist name to its list of result rows.
+    """
+    seeded = {}
+    for path in seed_paths:
+        if not os.path.exists(path):
+            logging.warning(f"⚠️ Seed file not found: {path}")
+            continue
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        for record in df.to_dict("records"):
+            name = clean_name(record["artist"])
+            if name:
+                seeded.setdefault(name, []).append(record)
+    return seeded
+
+
+def _seed_cache(cache_path: str, seed_paths: list) -> None:
+    """
+    Bulk-loads the seed CSV files into the response cache. Each file is
+    loaded once per version, and existing cache entries are never replaced.
+    If eviction removed seeded artists, every seed file is loaded again.
+
+    Args:
+        cache_path (str): SQLite response cache.
+        seed_paths (list): Paths of the seed CSV files.
+    """
+    conn = open_cache(cache_path)
+    try:
+        reseed = seeds_evicted(conn)
+        pending = [
+            path for path in seed_paths
+            if os.path.exists(path) and (reseed or not is_seeded(conn, path))
+        ]
+        if not pending:
+            return
+        added = seed_cached(conn, _load_seed_results(pending))
+        for path in pending:
+            mark_seeded(conn, path)
+        logging.info(f"🌱 Seeded {added} artists into the Wikidata cache")
+    finally:
+        conn.close()
+
+
 def build_sparql_query(artists: list) -> str:
     """
     Builds a SPARQL query to fetch data for a batch of artists.
@@ -82,7 +313,7 @@ def build_sparql_query(artists: list) -> str:
     """
     values = "\n".join([f'"{name}"@en' for name in artists])
     return f"""
-    SELECT ?artistLabel ?countryLabel ?awardLabel ?genderLabel (COUNT(?album) AS ?album_count) WHERE {{
+    SELECT ?name ?artistLabel ?countryLabel ?awardLabel ?genderLabel (COUNT(?album) AS ?album_count) WHERE {{
       VALUES ?name {{ {values} }}
       ?artist rdfs:label ?name.
       OPTIONAL {{ ?artist wdt:P166 ?award. }}
@@ -94,80 +325,725 @@ def build_sparql_query(artists: list) -> str:
       }}
       SERVICE wikibase:label {{ bd:serviceParam wikibase:language "[AUTO_LANGUAGE],en". }}
     }}
-    GROUP BY ?artistLabel ?countryLabel ?awardLabel ?genderLabel
+    GROUP BY ?name ?artistLabel ?countryLabel ?awardLabel ?genderLabel
+    """
+
+
+def _values_clause(artists: list) -> str:
+    """Builds the ``VALUES ?name`` block shared by the split sub-queries."""
+    values = "\n".join([f'"{name}"@en' for name in artists])
+    return f"VALUES ?name {{ {values} }}"
+
+
+def build_attributes_query(artists: list) -> str:
+    """
+    Builds the sub-query that returns the country and gender labels of
+    each artist. Artists without a Wikidata match produce no rows.
+
+    Args:
+        artists (list): List of artist names.
+
+    Returns:
+        str: A formatted SPARQL query string.
+    """
+    return f"""
+    SELECT DISTINCT ?name ?countryLabel ?genderLabel WHERE {{
+      {_values_clause(artists)}
+      ?artist rdfs:label ?name.
+      OPTIONAL {{ ?artist wdt:P27 ?country. }}
+      OPTIONAL {{ ?artist wdt:P21 ?gender. }}
+      SERVICE wikibase:label {{ bd:serviceParam wikibase:language "[AUTO_LANGUAGE],en". }}
+    }}
     """
 
 
-def _get_wikidata_results(artist_batch: list) -> dict | None:
+def build_awards_query(artists: list) -> str:
+    """
+    Builds the sub-query that returns one row per distinct award of each artist.
+
+    Args:
+        artists (list): List of artist names.
+
+    Returns:
+        str: A formatted SPARQL query string.
+    """
+    return f"""
+    SELECT DISTINCT ?name ?awardLabel WHERE {{
+      {_values_clause(artists)}
+      ?artist rdfs:label ?name.
+      ?artist wdt:P166 ?award.
+      SERVICE wikibase:label {{ bd:serviceParam wikibase:language "[AUTO_LANGUAGE],en". }}
+    }}
+    """
+
+
+def build_album_count_query(artists: list) -> str:
+    """
+    Builds the sub-query that counts albums per artist on the server, so
+    the response holds a single row per artist.
+
+    Args:
+        artists (list): List of artist names.
+
+    Returns:
+        str: A formatted SPARQL query string.
+    """
+    return f"""
+    SELECT ?name (COUNT(DISTINCT ?album) AS ?album_count) WHERE {{
+      {_values_clause(artists)}
+      ?artist rdfs:label ?name.
+      ?album wdt:P31 wd:Q482994.
+      ?album wdt:P175 ?artist.
+    }}
+    GROUP BY ?name
+    """
+
+
+class _TokenBucket:
+    """
+    Thread-safe token bucket shared by all the SPARQL workers.
+
+    Tokens are refilled at a constant rate up to the bucket capacity, and
+    every request has to take one before being sent. A ``pause`` (e.g. from a
+    ``Retry-After`` header) blocks every worker until the deadline passes.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Blocks until a token is available and consumes it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    elapsed = now - self._updated
+                    self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Stops handing out tokens for the given number of seconds. The bucket
+        is emptied and only starts refilling when the pause ends, so no
+        burst is sent right after it.
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0
+            self._updated = self._paused_until
+
+
+class WikidataUnavailable(RuntimeError):
+    """
+    The endpoint itself is failing (connection error, timeout, exhausted
+    throttling retries or server errors on every query). The run must be
+    retried later; no artist is quarantined for it.
+    """
+
+
+class _ServerError(WikidataUnavailable):
+    """
+    HTTP 5xx answer to one query. Wikidata also answers 500 to a query that
+    times out because of its content, so whether the batch or the endpoint
+    is to blame is decided by ``_bisect_batch`` and ``_shrink_batch``.
+    """
+
+
+_thread_local = threading.local()
+_counters_lock = threading.Lock()
+_request_counters = {"requests": 0, "throttled": 0, "bytes_sent": 0, "bytes_received": 0}
+
+
+def _count(**deltas) -> None:
+    """Adds to the process-wide SPARQL request counters."""
+    with _counters_lock:
+        for key, value in deltas.items():
+            _request_counters[key] += value
+
+
+def _snapshot_counters() -> dict:
+    """Returns a copy of the process-wide SPARQL request counters."""
+    with _counters_lock:
+        return dict(_request_counters)
+
+
+def _get_session() -> requests.Session:
+    """Returns a requests session owned by the calling thread."""
+    if not hasattr(_thread_local, "session"):
+        _thread_local.session = requests.Session()
+        _thread_local.session.headers.update(HEADERS)
+    return _thread_local.session
+
+
+def _retry_after_seconds(response: requests.Response, attempt: int) -> float:
+    """
+    Computes how long to wait before retrying a throttled request.
+
+    Args:
+        response (requests.Response): The 429/503 response from the endpoint.
+        attempt (int): Zero-based number of the failed attempt.
+
+    Returns:
+        float: Seconds to wait, taken from ``Retry-After`` when present and
+               from an exponential backoff otherwise.
+    """
+    header = response.headers.get("Retry-After")
+    if header:
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(header)
+                return max(0.0, retry_at.timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return BACKOFF_SECONDS * (2 ** attempt)
+
+
+def _parse_binding(row: dict) -> dict:
+    """
+    Converts a single SPARQL result binding into an output record.
+
+    Args:
+        row (dict): One element of ``results.bindings``.
+
+    Returns:
+        dict: Record with the artist, country, award, gender and album count.
+    """
+    return {
+        "artist": row.get("artistLabel", {}).get("value", ""),
+        "country": row.get("countryLabel", {}).get("value", ""),
+        "award": row.get("awardLabel", {}).get("value", "No awards"),
+        "gender": row.get("genderLabel", {}).get("value", "Unknown"),
+        "album_count": row.get("album_count", {}).get("value", "0")
+    }
+
+
+def _get_wikidata_results(
+    artist_batch: list,
+    limiter: _TokenBucket = None,
+    query_builder=build_sparql_query
+) -> dict | None:
     """
     Sends a POST request to Wikidata with a SPARQL query 
     for a batch of artists.
 
+    Throttling answers (HTTP 429/503) are retried up to ``MAX_RETRIES`` times,
+    honouring ``Retry-After`` and pausing the shared rate limiter so the
+    other workers back off too.
+
     Args:
         artist_batch (list): A list of artist names for the query.
+        limiter (_TokenBucket, optional): Rate limiter shared by the workers.
+        query_builder (callable): Function that turns the batch into a query.
 
     Returns:
-        dict or None: JSON response from Wikidata if successful, else None.
+        dict or None: JSON response from Wikidata if successful, None if the
+                      query itself was rejected (HTTP 4xx or an invalid body).
+
+    Raises:
+        WikidataUnavailable: On connection errors, timeouts and throttling
+                             that outlasts the retries.
+        _ServerError: On any other HTTP 5xx answer.
     """
-    query = build_sparql_query(artist_batch)
-    try:
-        response = requests.post(
-            WIKIDATA_ENDPOINT, data={"query": query}, headers=HEADERS
+    query = query_builder(artist_batch)
+    for attempt in range(MAX_RETRIES + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            response = _get_session().post(WIKIDATA_ENDPOINT, data={"query": query})
+        except requests.exceptions.RequestException as e:
+            logging.error(f"❌ Wikidata unreachable: {e}")
+            raise WikidataUnavailable(f"Wikidata unreachable: {e}") from e
+
+        body = response.request.body if response.request is not None else None
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        _count(
+            requests=1,
+            bytes_sent=len(body or b""),
+            bytes_received=len(response.content)
         )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        logging.error(f"❌ SPARQL request error: {e}")
+        if response.status_code in RETRY_STATUS_CODES:
+            if attempt == MAX_RETRIES:
+                raise WikidataUnavailable(f"Wikidata still throttling after {MAX_RETRIES} retries")
+            _count(throttled=1)
+            wait = _retry_after_seconds(response, attempt)
+            logging.warning(f"⏳ HTTP {response.status_code} from Wikidata, retrying in {wait:.1f}s")
+            if limiter is not None:
+                limiter.pause(wait)
+            else:
+                time.sleep(wait)
+            continue
+        if response.status_code >= 500:
+            logging.error(f"❌ SPARQL server error: HTTP {response.status_code}")
+            raise _ServerError(f"HTTP {response.status_code} from Wikidata")
+        try:
+            response.raise_for_status()
+            return response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logging.error(f"❌ SPARQL request error: {e}")
+            return None
+    return None
+
+
+def _endpoint_available(limiter: _TokenBucket) -> bool:
+    """
+    Sends a trivial query to tell a failing endpoint from failing batches.
+
+    Args:
+        limiter (_TokenBucket): Rate limiter shared by the workers.
+
+    Returns:
+        bool: True if the endpoint answers.
+    """
+    try:
+        return _get_wikidata_results([], limiter, lambda _: PROBE_QUERY) is not None
+    except WikidataUnavailable:
+        return False
+
+
+def _query_combined(artist_batch: list, limiter: _TokenBucket) -> dict | None:
+    """
+    Queries a batch with the single grouped query.
+
+    Args:
+        artist_batch (list): Artist names of the batch.
+        limiter (_TokenBucket): Rate limiter shared by the workers.
+
+    Returns:
+        dict or None: Mapping of artist name to its result rows, or None on failure.
+    """
+    data = _get_wikidata_results(artist_batch, limiter)
+    if not data:
         return None
+    results = {name: [] for name in artist_batch}
+    for row in data["results"]["bindings"]:
+        name = row.get("name", {}).get("value")
+        results.setdefault(name, []).append(_parse_binding(row))
+    return results
 
 
-def _query_wikidata(unique_artists: list) -> list:
+def _query_split(artist_batch: list, limiter: _TokenBucket) -> dict | None:
     """
-    Queries Wikidata in batches for the given list of unique artists.
+    Queries a batch with the attribute, award and album-count sub-queries,
+    folding every binding straight into a per-artist record.
+
+    Each artist is then emitted as one row per award (or a single
+    ``"No awards"`` row) carrying its first country and gender, which keeps
+    the ``artist,country,award,gender,album_count`` layout expected by
+    ``transformation_api`` without the cross product of the combined query.
+
+    Args:
+        artist_batch (list): Artist names of the batch.
+        limiter (_TokenBucket): Rate limiter shared by the workers.
+
+    Returns:
+        dict or None: Mapping of artist name to its result rows, or None if
+                      any of the sub-queries failed.
+    """
+    records = {}
+
+    data = _get_wikidata_results(artist_batch, limiter, build_attributes_query)
+    if not data:
+        return None
+    for row in data["results"]["bindings"]:
+        record = records.setdefault(
+            row["name"]["value"], {"countries": set(), "genders": set(), "awards": set(), "album_count": "0"}
+        )
+        if "countryLabel" in row:
+            record["countries"].add(row["countryLabel"]["value"])
+        if "genderLabel" in row:
+            record["genders"].add(row["genderLabel"]["value"])
+
+    matched = [name for name in artist_batch if name in records]
+    if matched:
+        data = _get_wikidata_results(matched, limiter, build_awards_query)
+        if not data:
+            return None
+        for row in data["results"]["bindings"]:
+            records[row["name"]["value"]]["awards"].add(row["awardLabel"]["value"])
+
+        data = _get_wikidata_results(matched, limiter, build_album_count_query)
+        if not data:
+            return None
+        for row in data["results"]["bindings"]:
+            records[row["name"]["value"]]["album_count"] = row["album_count"]["value"]
+
+    results = {name: [] for name in artist_batch}
+    for name, record in records.items():
+        country = min(record["countries"]) if record["countries"] else ""
+        gender = min(record["genders"]) if record["genders"] else "Unknown"
+        results[name] = [
+            {
+                "artist": name,
+                "country": country,
+                "award": award,
+                "gender": gender,
+                "album_count": record["album_count"]
+            }
+            for award in (sorted(record["awards"]) or ["No awards"])
+        ]
+    return results
+
+
+QUERY_STRATEGIES = {
+    "combined": _query_combined,
+    "split": _query_split
+}
+
+
+def _plan_batches(unique_artists: list, batch_size: int = BATCH_SIZE) -> list:
+    """
+    Splits the artist list into consecutive batches whose query fits
+    within ``MAX_QUERY_SIZE``.
 
     Args:
         unique_artists (list): List of cleaned, unique artist names.
+        batch_size (int): Preferred number of artists per batch.
 
     Returns:
-        list: A list of dictionaries with artist data from Wikidata.
+        list: List of artist batches, in the original order.
     """
-    results = []
+    batches = []
     i = 0
+    while i < len(unique_artists):
+        size = batch_size
+        while size > 1 and len(build_sparql_query(unique_artists[i:i + size]).encode("utf-8")) > MAX_QUERY_SIZE:
+            size -= 5
+        size = max(size, 1)
+        batches.append(unique_artists[i:i + size])
+        i += size
+    return batches
+
+
+def _shrink_batch(batch: list, limiter: _TokenBucket, query_batch) -> tuple:
+    """
+    Fetches one batch, halving the request size on failure and finally
+    skipping artists one at a time, as the serial extractor used to do.
+    Server errors only count against the artists while the endpoint still
+    answers a probe query.
+
+    Args:
+        batch (list): Artist names of the batch.
+        limiter (_TokenBucket): Rate limiter shared by the workers.
+        query_batch (callable): Strategy function from ``QUERY_STRATEGIES``.
 
-    logging.info("🚀 Querying Wikidata...")
-    with tqdm(total=len(unique_artists), desc="🔎 SPARQL Batches") as pbar:
-        while i < len(unique_artists):
-            batch_size = 80
-            batch_success = False
-
-            while batch_size > 0 and not batch_success:
-                batch = unique_artists[i:i + batch_size]
-                query = build_sparql_query(batch)
-
-                if len(query.encode("utf-8")) > MAX_QUERY_SIZE:
-                    batch_size -= 5
-                    continue
-
-                data = _get_wikidata_results(batch)
-                if data:
-                    for row in data["results"]["bindings"]:
-                        results.append({
-                            "artist": row.get("artistLabel", {}).get("value", ""),
-                            "country": row.get("countryLabel", {}).get("value", ""),
-                            "award": row.get("awardLabel", {}).get("value", "No awards"),
-                            "gender": row.get("genderLabel", {}).get("value", "Unknown"),
-                            "album_count": row.get("album_count", {}).get("value", "0")
-                        })
-                    batch_success = True
-                    i += batch_size
-                    pbar.update(batch_size)
-                    time.sleep(0.8)
+    Returns:
+        tuple: ``(results, skipped, failed_requests)``.
+
+    Raises:
+        WikidataUnavailable: If the endpoint itself is failing.
+    """
+    results = {}
+    skipped = []
+    failed_requests = 0
+    i = 0
+    while i < len(batch):
+        batch_size = len(batch) - i
+        batch_success = False
+
+        while batch_size > 0 and not batch_success:
+            try:
+                fetched = query_batch(batch[i:i + batch_size], limiter)
+            except _ServerError:
+                if not _endpoint_available(limiter):
+                    raise
+                fetched = None
+            if fetched is not None:
+                results.update(fetched)
+                batch_success = True
+                i += batch_size
+            else:
+                failed_requests += 1
+                batch_size //= 2
+
+        if not batch_success:
+            logging.warning(f"⚠️ Skipping artist: {batch[i]}")
+            skipped.append(batch[i])
+            i += 1
+
+    return results, skipped, failed_requests
+
+
+def _bisect_batch(batch: list, limiter: _TokenBucket, query_batch) -> tuple:
+    """
+    Fetches one batch, splitting a failing request in two halves until the
+    artists that make it fail are isolated. Healthy halves are fetched as a
+    whole, so a single bad name costs about ``2 * log2(len(batch))`` requests.
+
+    A server error is only blamed on the batch when the endpoint is shown to
+    be healthy: a sibling half succeeded, or a probe query is answered after
+    both halves failed. Otherwise the endpoint is down, and the batch is
+    neither bisected further nor quarantined.
+
+    Args:
+        batch (list): Artist names of the batch.
+        limiter (_TokenBucket): Rate limiter shared by the workers.
+        query_batch (callable): Strategy function from ``QUERY_STRATEGIES``.
+
+    Returns:
+        tuple: ``(results, skipped, failed_requests)``.
+
+    Raises:
+        WikidataUnavailable: If the endpoint itself is failing.
+    """
+    results = {}
+    skipped = []
+    failed_requests = 0
+
+    def fetch(part: list) -> str | None:
+        """Queries a part; returns None on success, else 'rejected' or 'server'."""
+        nonlocal failed_requests
+        try:
+            fetched = query_batch(part, limiter)
+        except _ServerError:
+            failed_requests += 1
+            return "server"
+        if fetched is None:
+            failed_requests += 1
+            return "rejected"
+        results.update(fetched)
+        return None
+
+    failure = fetch(batch)
+    if failure == "server" and not _endpoint_available(limiter):
+        raise WikidataUnavailable("Wikidata fails every query")
+    pending = [batch] if failure else []
+    while pending:
+        part = pending.pop()
+        if len(part) == 1:
+            logging.warning(f"⚠️ Isolated failing artist: {part[0]}")
+            skipped.append(part[0])
+            continue
+        middle = len(part) // 2
+        halves = [part[:middle], part[middle:]]
+        failures = [fetch(half) for half in halves]
+        if failures == ["server", "server"] and not _endpoint_available(limiter):
+            raise WikidataUnavailable("Wikidata fails every query")
+        pending.extend(half for half, failed in reversed(list(zip(halves, failures))) if failed)
+
+    return results, skipped, failed_requests
+
+
+ISOLATION_MODES = {
+    "shrink": _shrink_batch,
+    "bisect": _bisect_batch
+}
+
+
+def _fetch_batch(
+    batch: list,
+    limiter: _TokenBucket,
+    query_strategy: str = QUERY_STRATEGY,
+    isolation: str = ISOLATION_MODE
+) -> tuple:
+    """
+    Fetches one batch with the given query strategy and failure isolation mode.
+
+    Args:
+        batch (list): Artist names of the batch.
+        limiter (_TokenBucket): Rate limiter shared by the workers.
+        query_strategy (str): Name of the strategy in ``QUERY_STRATEGIES``.
+        isolation (str): Name of the mode in ``ISOLATION_MODES``.
+
+    Returns:
+        tuple: ``(results, skipped, failed_requests)`` where ``results`` maps each
+               successfully queried artist name to its list of result rows
+               (empty when Wikidata has no match), ``skipped`` lists the artists
+               that could not be fetched and ``failed_requests`` counts the
+               requests spent on failures.
+    """
+    return ISOLATION_MODES[isolation](batch, limiter, QUERY_STRATEGIES[query_strategy])
+
+
+def _plan_spans(unique_artists: list, start_index: int, missing: list, batch_size: int = BATCH_SIZE) -> list:
+    """
+    Cuts the artist list into consecutive spans of at most ``SPAN_SIZE``
+    artists, each with the batch of missing artists it has to query.
+
+    Args:
+        unique_artists (list): List of cleaned, unique artist names.
+        start_index (int): Position to start from.
+        missing (list): Sorted positions of the artists that must be queried.
+        batch_size (int): Preferred number of artists per batch.
+
+    Returns:
+        list: Tuples ``(start, end, batch)``; ``batch`` may be empty when the
+              whole span is served locally.
+    """
+    spans = []
+    k = 0
+    for start in range(start_index, len(unique_artists), SPAN_SIZE):
+        end = min(start + SPAN_SIZE, len(unique_artists))
+        positions = []
+        while k < len(missing) and missing[k] < end:
+            positions.append(missing[k])
+            k += 1
+        batches = _plan_batches([unique_artists[i] for i in positions], batch_size)
+        if not batches:
+            spans.append((start, end, []))
+            continue
+        consumed = 0
+        for number, batch in enumerate(batches):
+            consumed += len(batch)
+            batch_end = end if number == len(batches) - 1 else positions[consumed - 1] + 1
+            spans.append((start, batch_end, batch))
+            start = batch_end
+    return spans
+
+
+def _query_wikidata(
+    unique_artists: list,
+    max_workers: int = MAX_WORKERS,
+    requests_per_second: float = REQUESTS_PER_SECOND,
+    cache_path: str | None = CACHE_PATH,
+    cache_ttl_days: float | None = CACHE_TTL_DAYS,
+    offline: bool = False,
+    query_strategy: str = QUERY_STRATEGY,
+    start_index: int = 0,
+    seeded: dict | None = None,
+    isolation: str = ISOLATION_MODE,
+    batch_size: int = BATCH_SIZE,
+    stats: dict | None = None
+):
+    """
+    Queries Wikidata in batches for the given list of unique artists.
+
+    Artists already in the response cache (and not expired) are served from
+    it. The remaining ones are fetched concurrently by a bounded thread pool
+    that shares a token-bucket rate limiter, and written to the cache as
+    each batch completes. Results are yielded span by span in the order of
+    the input list regardless of the order in which batches complete, with
+    at most ``2 * max_workers`` spans in flight.
+
+    Artists that keep failing after isolation are put in a persistent
+    quarantine and skipped by later runs until their retry is due; their
+    last cached rows, even expired, are served meanwhile. A failing endpoint
+    quarantines nobody: ``WikidataUnavailable`` propagates so the task fails
+    and is retried, resuming from the cache and the parquet checkpoint.
+
+    Args:
+        unique_artists (list): List of cleaned, unique artist names.
+        max_workers (int): Maximum number of batches in flight at the same time.
+        requests_per_second (float): Sustained request rate allowed against the endpoint.
+        cache_path (str, optional): SQLite response cache, ``None`` disables caching.
+        cache_ttl_days (float, optional): Age after which cached artists are re-queried.
+        offline (bool): If True, serve every cached artist regardless of age
+                        and skip the network entirely.
+        query_strategy (str): Name of the strategy in ``QUERY_STRATEGIES``.
+        start_index (int): Position in ``unique_artists`` to start from.
+        seeded (dict, optional): Local results used instead of the cache.
+        isolation (str): Name of the mode in ``ISOLATION_MODES``.
+        batch_size (int): Preferred number of artists per SPARQL request.
+        stats (dict, optional): Filled with ``failed_requests``, ``quarantined``,
+                                ``skipped_quarantined`` and the request, throttling
+                                and byte counters of the run.
+
+    Yields:
+        tuple: ``(next_index, rows)`` with the rows of each span as dictionaries.
+
+    Raises:
+        WikidataUnavailable: If the endpoint is unreachable or failing.
+    """
+    if query_strategy not in QUERY_STRATEGIES:
+        raise ValueError(f"Unknown query strategy: {query_strategy}")
+    if isolation not in ISOLATION_MODES:
+        raise ValueError(f"Unknown isolation mode: {isolation}")
+    stats = {} if stats is None else stats
+    stats.update(failed_requests=0, quarantined=0, skipped_quarantined=0)
+    baseline = _snapshot_counters()
+
+    conn = open_cache(cache_path) if cache_path else None
+    try:
+        ttl = None if offline else cache_ttl_days
+        pending_names = unique_artists[start_index:]
+        if conn:
+            local = get_fresh_names(conn, pending_names, ttl)
+        else:
+            local = set(seeded or ())
+
+        blocked = get_quarantined(conn, pending_names) if conn and not offline else set()
+        stats["skipped_quarantined"] = len(blocked)
+        if blocked:
+            logging.info(f"🚧 Skipping {len(blocked)} quarantined artists")
+
+        missing = [
+            i for i in range(start_index, len(unique_artists))
+            if unique_artists[i] not in local and unique_artists[i] not in blocked
+        ]
+        if offline:
+            logging.info(f"📴 Offline run: {len(pending_names) - len(missing)} artists available locally, "
+                         f"{len(missing)} left out")
+            missing = []
+        else:
+            logging.info(f"💾 {len(pending_names) - len(missing)} artists served from cache, "
+                         f"{len(missing)} to query")
+
+        spans = iter(_plan_spans(unique_artists, start_index, missing, batch_size))
+        limiter = _TokenBucket(requests_per_second, capacity=max(1, max_workers))
+
+        if missing:
+            logging.info(f"🚀 Querying Wikidata ({max_workers} workers)...")
+        with tqdm(total=len(pending_names), desc="🔎 SPARQL Batches") as pbar, \
+                ThreadPoolExecutor(max_workers=max_workers) as executor:
+            in_flight = deque()
+
+            def submit_next() -> None:
+                span = next(spans, None)
+                if span is not None:
+                    batch = span[2]
+                    future = (
+                        executor.submit(_fetch_batch, batch, limiter, query_strategy, isolation)
+                        if batch else None
+                    )
+                    in_flight.append((span, future))
+
+            for _ in range(2 * max_workers):
+                submit_next()
+
+            while in_flight:
+                (start, end, _), future = in_flight.popleft()
+                artist_rows, skipped, failed_requests = future.result() if future else ({}, [], 0)
+                submit_next()
+                stats["failed_requests"] += failed_requests
+                stats["quarantined"] += len(skipped)
+                if conn:
+                    put_cached(conn, artist_rows)
+                    release_quarantine(conn, list(artist_rows))
+                    quarantine(conn, skipped)
+
+                names = unique_artists[start:end]
+                served = [name for name in names if name in local]
+                if conn:
+                    # Quarantined artists keep their last known rows, even expired.
+                    stale = [name for name in names if name in blocked or name in skipped]
+                    artist_rows.update(get_cached(conn, served + stale, None))
                 else:
-                    batch_size //= 2
+                    artist_rows.update((name, seeded[name]) for name in served)
 
-            if not batch_success:
-                logging.warning(f"⚠️ Skipping artist at index {i}: {unique_artists[i]}")
-                i += 1
-                pbar.update(1)
+                current = _snapshot_counters()
+                stats.update((key, current[key] - baseline[key]) for key in current)
+                pbar.update(end - start)
+                yield end, [row for name in names for row in artist_rows.get(name, [])]
 
-    return results
+        if missing:
+            logging.info(f"📊 {stats['failed_requests']} requests spent on failures, "
+                         f"{stats['quarantined']} artists quarantined")
+        if conn and not offline:
+            evict(conn, cache_ttl_days)
+    finally:
+        if conn:
+            conn.close()
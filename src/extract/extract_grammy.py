@@ -1,60 +1,223 @@
 import os
 import json
 import pandas as pd
-from sqlalchemy import create_engine
+import pyarrow as pa
+from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
-from typing import Dict, Any
+from typing import Iterator, Union
 
+from src.database import get_engine
 
-def extract_data() -> pd.DataFrame:
+GRAMMY_TABLE = "grammys_raw_data"
+GRAMMY_COLUMNS = ["year", "title", "category", "nominee", "artist", "workers", "winner"]
+GRAMMY_ARROW_SCHEMA = pa.schema([
+    ("year", pa.int64()),
+    ("title", pa.string()),
+    ("category", pa.string()),
+    ("nominee", pa.string()),
+    ("artist", pa.string()),
+    ("workers", pa.string()),
+    ("winner", pa.bool_())
+])
+CHUNK_SIZE = 50000
+WATERMARK_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'cache', 'grammy_watermark.json')
+)
+
+
+def build_grammy_query(
+    columns: list = GRAMMY_COLUMNS,
+    drop_null_nominees: bool = True,
+    changed_since: bool = False
+) -> str:
+    """
+    Builds the SELECT statement for the Grammy table with the column
+    projection and row filters pushed down to the database.
+
+    Args:
+        columns (list): Columns to read. ``None`` reads every column.
+        drop_null_nominees (bool): Whether to skip rows with a null 'nominee'.
+        changed_since (bool): Whether to keep only rows whose 'updated_at' is
+                              later than the ``:since`` bind parameter.
+
+    Returns:
+        str: SQL query string.
+    """
+    projection = ", ".join(f'"{column}"' for column in columns) if columns else "*"
+    conditions = []
+    if drop_null_nominees:
+        conditions.append("nominee IS NOT NULL")
+    if changed_since:
+        conditions.append("CAST(updated_at AS timestamptz) > CAST(:since AS timestamptz)")
+
+    query = f"SELECT {projection} FROM {GRAMMY_TABLE}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    return query
+
+
+def extract_data(
+    columns: list = GRAMMY_COLUMNS,
+    drop_null_nominees: bool = True,
+    chunksize: int | None = None
+) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
     """
     Extracts data from the Grammy dataset stored in a PostgreSQL database.
 
     This function reads the database credentials from a JSON file, connects to the
-    PostgreSQL database using SQLAlchemy, and retrieves all rows from the
-    'grammys_raw_data' table.
+    PostgreSQL database using SQLAlchemy, and retrieves the rows of the
+    'grammys_raw_data' table. Only the columns used by the transform are read
+    and rows without a nominee are filtered in SQL. With ``chunksize``, rows
+    are streamed through a server-side cursor and returned as an iterator of
+    DataFrames instead of a single one.
 
-    It assumes the credentials file is located at 'Workshop_002/credentials.json'
-    and that the script is executed from a path where moving one level up gives access
-    to that folder.
+    Args:
+        columns (list): Columns to read, ``None`` reads every column.
+        drop_null_nominees (bool): Whether to skip rows with a null 'nominee' in SQL.
+        chunksize (int, optional): Number of rows per DataFrame when streaming.
 
     Returns:
-        pd.DataFrame: A DataFrame containing the raw Grammy data from the database.
+        pd.DataFrame or Iterator[pd.DataFrame]: The raw Grammy data from the database.
 
     Raises:
-        FileNotFoundError: If the working directory is incorrect or the credentials file is missing.
+        FileNotFoundError: If the credentials file is missing.
         KeyError: If any expected keys are missing in the credentials JSON.
         SQLAlchemyError: If there's a problem connecting to or querying the database.
     """
+    engine = _create_engine()
+    query = build_grammy_query(columns, drop_null_nominees)
+    if chunksize:
+        return _iter_chunks(engine, query, chunksize)
+
     try:
-        os.chdir(os.path.join("..", "..", "Workshop_002"))
-    except FileNotFoundError:
-        raise FileNotFoundError("The directory '../../Workshop_002' does not exist or is not accessible.")
+        with engine.connect() as conn:
+            df = pd.read_sql(sql=query, con=conn.connection)
+    except SQLAlchemyError as e:
+        raise SQLAlchemyError(f"Database error: {e}")
+
+    return df
+
+
+def extract_arrow(
+    columns: list = GRAMMY_COLUMNS,
+    drop_null_nominees: bool = True,
+    chunksize: int = CHUNK_SIZE
+) -> pa.Table:
+    """
+    Extracts the Grammy data as a typed Arrow table, reading it in chunks
+    through a server-side cursor.
+
+    Args:
+        columns (list): Columns to read; they must be part of ``GRAMMY_ARROW_SCHEMA``.
+        drop_null_nominees (bool): Whether to skip rows with a null 'nominee' in SQL.
+        chunksize (int): Number of rows fetched per round-trip.
 
-    credentials_path = os.path.join("credentials.json")
+    Returns:
+        pa.Table: The Grammy data with the types of ``GRAMMY_ARROW_SCHEMA``.
+    """
+    schema = pa.schema([GRAMMY_ARROW_SCHEMA.field(column) for column in columns])
+    batches = [
+        pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+        for chunk in extract_data(columns, drop_null_nominees, chunksize)
+    ]
+    return pa.concat_tables(batches) if batches else schema.empty_table()
 
-    if not os.path.exists(credentials_path):
-        raise FileNotFoundError(f"Credentials file not found at: {credentials_path}")
 
-    with open(credentials_path, "r", encoding="utf-8") as file:
-        credentials: Dict[str, Any] = json.load(file)
+def extract_changes(
+    since: str | None,
+    columns: list = GRAMMY_COLUMNS
+) -> tuple[pd.DataFrame, str | None]:
+    """
+    Extracts the Grammy rows updated after a high-water mark.
+
+    Args:
+        since (str, optional): ISO timestamp of the last processed 'updated_at'.
+                               ``None`` extracts every row.
+        columns (list): Columns to read besides 'updated_at'.
 
+    Returns:
+        tuple: The changed rows (without 'updated_at') and the new high-water
+               mark, which is ``since`` itself when nothing changed.
+    """
+    engine = _create_engine()
+    query = build_grammy_query([*columns, "updated_at"], changed_since=since is not None)
     try:
-        db_host = credentials["db_host"]
-        db_name = credentials["db_name"]
-        db_user = credentials["db_user"]
-        db_password = credentials["db_password"]
-    except KeyError as e:
-        raise KeyError(f"Missing key in credentials file: {e}")
+        with engine.connect() as conn:
+            df = pd.read_sql(sql=text(query), con=conn, params={"since": since} if since else None)
+    except SQLAlchemyError as e:
+        raise SQLAlchemyError(f"Database error: {e}")
+
+    watermark = since
+    if not df.empty:
+        watermark = pd.to_datetime(df["updated_at"], utc=True).max().isoformat()
+    return df.drop(columns=["updated_at"]), watermark
+
+
+def read_watermark(path: str = WATERMARK_PATH) -> str | None:
+    """
+    Reads the 'updated_at' high-water mark of the last successful run.
+
+    Args:
+        path (str): JSON file holding the watermark.
 
+    Returns:
+        str or None: The stored ISO timestamp, or None if there is none yet.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file).get("updated_at")
+
+
+def save_watermark(watermark: str | None, path: str = WATERMARK_PATH) -> None:
+    """
+    Atomically stores the 'updated_at' high-water mark. It must only be
+    called once the changed rows have been processed successfully. The
+    mark never moves backwards, so a run finishing after a later one does
+    not make the next run re-read rows it already processed.
+
+    Args:
+        watermark (str, optional): ISO timestamp to store.
+        path (str): JSON file holding the watermark.
+    """
+    if watermark is None:
+        return
+    current = read_watermark(path)
+    if current is not None and pd.Timestamp(current) >= pd.Timestamp(watermark):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump({"updated_at": watermark}, file)
+    os.replace(tmp_path, path)
+
+
+def _iter_chunks(engine, query: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    """
+    Streams a query through a server-side cursor.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): Engine connected to the database.
+        query (str): SQL query string.
+        chunksize (int): Number of rows per DataFrame.
+
+    Yields:
+        pd.DataFrame: Consecutive chunks of the result.
+    """
     try:
-        engine = create_engine(
-            f"postgresql://{db_user}:{db_password}@{db_host}:5432/{db_name}"
-        )
-        query = "SELECT * FROM grammys_raw_data"
         with engine.connect() as conn:
-            df = pd.read_sql(sql=query, con=conn.connection)
+            conn = conn.execution_options(stream_results=True)
+            for chunk in pd.read_sql(sql=text(query), con=conn, chunksize=chunksize):
+                yield chunk
     except SQLAlchemyError as e:
         raise SQLAlchemyError(f"Database error: {e}")
 
-    return df
+
+def _create_engine():
+    """
+    Returns the shared, pooled engine of the Grammy database.
+
+    Returns:
+        sqlalchemy.engine.Engine: Engine connected to the Grammy database.
+    """
+    return get_engine()
@@ -1,34 +1,111 @@
 import os
 import pandas as pd
+from typing import Iterator, Union
 
+SPOTIFY_CSV = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'spotify_dataset.csv')
+)
 
-def extract_spotify_data() -> pd.DataFrame:
+# Declared schema of the Spotify source. Thresholded features (bins and
+# booleans in transform_spotify) stay float64 so boundary values compare
+# exactly as before. Integer and boolean columns are nullable so that a null
+# in the source does not fail the read; transform_spotify casts them to
+# their NumPy dtype (NOT_NULL_DTYPES) once the rows with nulls are dropped.
+SPOTIFY_SCHEMA = {
+    "Unnamed: 0": "Int32",
+    "track_id": "object",
+    "artists": "object",
+    "album_name": "object",
+    "track_name": "object",
+    "popularity": "Int8",
+    "duration_ms": "Int32",
+    "explicit": "boolean",
+    "danceability": "float64",
+    "energy": "float64",
+    "key": "Int8",
+    "loudness": "float64",
+    "mode": "Int8",
+    "speechiness": "float64",
+    "acousticness": "float64",
+    "instrumentalness": "float64",
+    "liveness": "float64",
+    "valence": "float64",
+    "tempo": "float64",
+    "time_signature": "Int8",
+    "track_genre": "category"
+}
+
+# Row number written by the export of the dataset.
+ROW_NUMBER_COLUMN = "Unnamed: 0"
+# Columns dropped by transform_spotify.delete_columns that nothing reads
+# before. They only took part in the content-based dedups, which the unique
+# 'Unnamed: 0' row number already makes row-exact, and in the null filter,
+# which is restricted to transform_spotify.NOT_NULL_COLUMNS. A source
+# without the row number is read whole, as the dedups then depend on them.
+UNUSED_COLUMNS = ["key", "mode", "time_signature", "tempo", "speechiness", "acousticness", "instrumentalness"]
+SPOTIFY_COLUMNS = [column for column in SPOTIFY_SCHEMA if column not in UNUSED_COLUMNS]
+
+
+def extract_spotify_data(
+    columns: list | None = SPOTIFY_COLUMNS,
+    engine: str = "c",
+    chunksize: int | None = None
+) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
     """
     Extracts data from the Spotify dataset CSV file.
 
     The function constructs the path to the CSV file assuming it is located
     in a 'data' directory two levels above the current file's directory.
-    It attempts to read the file into a pandas DataFrame.
+    It reads only the requested columns with the compact dtypes declared in
+    ``SPOTIFY_SCHEMA`` ('track_genre' as a categorical). If the file has no
+    'Unnamed: 0' row number, every column of the schema is read instead.
+
+    Args:
+        columns (list, optional): Columns to read, ``None`` reads the whole schema.
+        engine (str): pandas CSV engine, ``"c"`` or ``"pyarrow"``. The pyarrow
+                      engine parses in parallel and stores text columns as
+                      ``string[pyarrow]``.
+        chunksize (int, optional): If set, returns an iterator of DataFrames with
+                                   this many rows each (C engine only).
 
     Returns:
-        pd.DataFrame: A DataFrame containing the data from 'spotify_dataset.csv'.
+        pd.DataFrame or Iterator[pd.DataFrame]: The data from 'spotify_dataset.csv'.
 
     Raises:
         FileNotFoundError: If the CSV file does not exist at the specified path.
+        ValueError: If chunked reading is requested with the pyarrow engine.
         Exception: If there is an issue reading the CSV file.
     """
-    base_dir = os.path.abspath(
-        os.path.join(os.path.dirname(__file__), '..', '..', 'data')
-    )
-    csv_path = os.path.join(base_dir, 'spotify_dataset.csv')
+    csv_path = SPOTIFY_CSV
 
     if not os.path.exists(csv_path):
         print(f"FileNotFoundError - The file '{csv_path}' was not found.\n"
               f"Current working directory: {os.getcwd()}")
         raise FileNotFoundError(f"File '{csv_path}' not found")
 
+    if chunksize and engine == "pyarrow":
+        raise ValueError("The pyarrow engine does not support chunked reading.")
+
+    header = pd.read_csv(csv_path, encoding="utf-8", nrows=0).columns
+    if ROW_NUMBER_COLUMN not in header:
+        columns = None
+    columns = [column for column in columns or SPOTIFY_SCHEMA if column in header]
+    dtypes = {column: SPOTIFY_SCHEMA[column] for column in columns}
+    if engine == "pyarrow":
+        dtypes = {
+            column: "string[pyarrow]" if dtype == "object" else dtype
+            for column, dtype in dtypes.items()
+        }
+
     try:
-        df = pd.read_csv(csv_path, encoding="utf-8")
+        df = pd.read_csv(
+            csv_path,
+            encoding="utf-8",
+            usecols=columns,
+            dtype=dtypes,
+            engine=engine,
+            chunksize=chunksize
+        )
     except Exception as e:
         print(f"Error reading the CSV file: {e}")
         raise
@@ -0,0 +1,332 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+
+CACHE_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'cache', 'wikidata_cache.sqlite')
+)
+CACHE_TTL_DAYS = 30
+CACHE_MAX_ENTRIES = 250000
+QUARANTINE_RETRY_DAYS = 1
+QUARANTINE_MAX_RETRY_DAYS = 30
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+def open_cache(path: str = CACHE_PATH) -> sqlite3.Connection:
+    """
+    Opens (and creates if needed) the on-disk Wikidata response cache.
+
+    Each entry is keyed by the cleaned artist name (see ``clean_name``) and
+    stores the JSON-encoded list of result rows for that name. An empty list
+    is a valid entry: it records that Wikidata had no match for the artist.
+
+    Args:
+        path (str): Location of the SQLite database file.
+
+    Returns:
+        sqlite3.Connection: Open connection to the cache database.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS artist_cache (
+            name TEXT PRIMARY KEY,
+            payload TEXT NOT NULL,
+            fetched_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_artist_cache_accessed ON artist_cache (accessed_at)")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS quarantine (
+            name TEXT PRIMARY KEY,
+            failures INTEGER NOT NULL,
+            last_failed_at REAL NOT NULL,
+            retry_at REAL NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS seed_files (
+            path TEXT PRIMARY KEY,
+            mtime REAL NOT NULL
+        )
+        """
+    )
+    conn.execute("CREATE TABLE IF NOT EXISTS seed_names (name TEXT PRIMARY KEY)")
+    conn.commit()
+    return conn
+
+
+def get_cached(conn: sqlite3.Connection, names: list, ttl_days: float | None = CACHE_TTL_DAYS) -> dict:
+    """
+    Looks up cached rows for the given artist names.
+
+    Args:
+        conn (sqlite3.Connection): Open cache connection.
+        names (list): Cleaned artist names to look up.
+        ttl_days (float, optional): Maximum age of a usable entry in days.
+                                    ``None`` accepts entries of any age.
+
+    Returns:
+        dict: Mapping of artist name to its list of cached rows, only for
+              names with a non-expired entry.
+    """
+    now = time.time()
+    oldest = now - ttl_days * 86400 if ttl_days is not None else float("-inf")
+    found = {}
+    for start in range(0, len(names), 500):
+        chunk = names[start:start + 500]
+        placeholders = ",".join("?" * len(chunk))
+        cursor = conn.execute(
+            f"SELECT name, payload FROM artist_cache WHERE fetched_at >= ? AND name IN ({placeholders})",
+            [oldest, *chunk]
+        )
+        found.update((name, json.loads(payload)) for name, payload in cursor)
+
+    if found:
+        conn.executemany(
+            "UPDATE artist_cache SET accessed_at = ? WHERE name = ?",
+            [(now, name) for name in found]
+        )
+        conn.commit()
+    return found
+
+
+def get_fresh_names(conn: sqlite3.Connection, names: list, ttl_days: float | None = CACHE_TTL_DAYS) -> set:
+    """
+    Returns which of the given artist names have a usable cache entry,
+    without loading their payloads.
+
+    Args:
+        conn (sqlite3.Connection): Open cache connection.
+        names (list): Cleaned artist names to look up.
+        ttl_days (float, optional): Maximum age of a usable entry in days.
+                                    ``None`` accepts entries of any age.
+
+    Returns:
+        set: Names with a non-expired entry.
+    """
+    oldest = time.time() - ttl_days * 86400 if ttl_days is not None else float("-inf")
+    fresh = set()
+    for start in range(0, len(names), 500):
+        chunk = names[start:start + 500]
+        placeholders = ",".join("?" * len(chunk))
+        cursor = conn.execute(
+            f"SELECT name FROM artist_cache WHERE fetched_at >= ? AND name IN ({placeholders})",
+            [oldest, *chunk]
+        )
+        fresh.update(name for (name,) in cursor)
+    return fresh
+
+
+def put_cached(conn: sqlite3.Connection, results: dict, fetched_at: float | None = None) -> None:
+    """
+    Stores (or refreshes) the rows of a set of artists.
+
+    Args:
+        conn (sqlite3.Connection): Open cache connection.
+        results (dict): Mapping of artist name to its list of result rows.
+        fetched_at (float, optional): Timestamp of the data, defaults to now.
+    """
+    if not results:
+        return
+    now = time.time()
+    fetched_at = now if fetched_at is None else fetched_at
+    conn.executemany(
+        "INSERT OR REPLACE INTO artist_cache (name, payload, fetched_at, accessed_at) VALUES (?, ?, ?, ?)",
+        [(name, json.dumps(rows, ensure_ascii=False), fetched_at, now) for name, rows in results.items()]
+    )
+    conn.commit()
+
+
+def get_quarantined(conn: sqlite3.Connection, names: list) -> set:
+    """
+    Returns which of the given artist names are quarantined and not yet
+    due for a retry.
+
+    Args:
+        conn (sqlite3.Connection): Open cache connection.
+        names (list): Cleaned artist names to check.
+
+    Returns:
+        set: Names that must be skipped in this run.
+    """
+    now = time.time()
+    blocked = set()
+    for start in range(0, len(names), 500):
+        chunk = names[start:start + 500]
+        placeholders = ",".join("?" * len(chunk))
+        cursor = conn.execute(
+            f"SELECT name FROM quarantine WHERE retry_at > ? AND name IN ({placeholders})",
+            [now, *chunk]
+        )
+        blocked.update(name for (name,) in cursor)
+    return blocked
+
+
+def quarantine(conn: sqlite3.Connection, names: list) -> None:
+    """
+    Quarantines artists whose queries keep failing. The retry delay starts
+    at ``QUARANTINE_RETRY_DAYS`` and doubles with every new failure, up to
+    ``QUARANTINE_MAX_RETRY_DAYS``.
+
+    Args:
+        conn (sqlite3.Connection): Open cache connection.
+        names (list): Cleaned artist names that failed.
+    """
+    if not names:
+        return
+    now = time.time()
+    for name in names:
+        row = conn.execute("SELECT failures FROM quarantine WHERE name = ?", (name,)).fetchone()
+        failures = (row[0] if row else 0) + 1
+        delay_days = min(QUARANTINE_RETRY_DAYS * 2 ** (failures - 1), QUARANTINE_MAX_RETRY_DAYS)
+        conn.execute(
+            "INSERT OR REPLACE INTO quarantine (name, failures, last_failed_at, retry_at) VALUES (?, ?, ?, ?)",
+            (name, failures, now, now + delay_days * 86400)
+        )
+    conn.commit()
+
+
+def release_quarantine(conn: sqlite3.Connection, names: list) -> None:
+    """
+    Removes artists from the quarantine after a successful query.
+
+    Args:
+        conn (sqlite3.Connection): Open cache connection.
+        names (list): Cleaned artist names that were fetched.
+    """
+    if not names:
+        return
+    conn.executemany("DELETE FROM quarantine WHERE name = ?", [(name,) for name in names])
+    conn.commit()
+
+
+def seed_cached(conn: sqlite3.Connection, results: dict) -> int:
+    """
+    Bulk-loads rows into the cache without overwriting existing entries.
+    The names are recorded as seeded, so that ``seeds_evicted`` can tell
+    when the seed files have to be loaded again.
+
+    Args:
+        conn (sqlite3.Connection): Open cache connection.
+        results (dict): Mapping of artist name to its list of result rows.
+
+    Returns:
+        int: Number of artists that were added.
+    """
+    now = time.time()
+    added = conn.executemany(
+        "INSERT OR IGNORE INTO artist_cache (name, payload, fetched_at, accessed_at) VALUES (?, ?, ?, ?)",
+        [(name, json.dumps(rows, ensure_ascii=False), now, now) for name, rows in results.items()]
+    ).rowcount
+    conn.executemany("INSERT OR IGNORE INTO seed_names (name) VALUES (?)", [(name,) for name in results])
+    conn.commit()
+    return added
+
+
+def seeds_evicted(conn: sqlite3.Connection) -> bool:
+    """
+    Checks whether eviction removed seeded artists from the cache, in which
+    case the seed files must be loaded again even if they did not change.
+
+    Args:
+        conn (sqlite3.Connection): Open cache connection.
+
+    Returns:
+        bool: True if a seeded name has no cache entry anymore, or if the
+              seeded names were not recorded (caches seeded before they were).
+    """
+    missing = conn.execute(
+        """
+        SELECT 1 FROM seed_names LEFT JOIN artist_cache USING (name)
+        WHERE artist_cache.name IS NULL LIMIT 1
+        """
+    ).fetchone()
+    if missing is not None:
+        return True
+    unrecorded = conn.execute(
+        "SELECT 1 FROM seed_files WHERE NOT EXISTS (SELECT 1 FROM seed_names) LIMIT 1"
+    ).fetchone()
+    return unrecorded is not None
+
+
+def is_seeded(conn: sqlite3.Connection, path: str) -> bool:
+    """
+    Checks whether a seed file has already been loaded in its current version.
+
+    Args:
+        conn (sqlite3.Connection): Open cache connection.
+        path (str): Seed file path.
+
+    Returns:
+        bool: True if the file was seeded and has not been modified since.
+    """
+    row = conn.execute("SELECT mtime FROM seed_files WHERE path = ?", (path,)).fetchone()
+    return row is not None and row[0] == os.path.getmtime(path)
+
+
+def mark_seeded(conn: sqlite3.Connection, path: str) -> None:
+    """
+    Records that a seed file has been loaded.
+
+    Args:
+        conn (sqlite3.Connection): Open cache connection.
+        path (str): Seed file path.
+    """
+    conn.execute(
+        "INSERT OR REPLACE INTO seed_files (path, mtime) VALUES (?, ?)", (path, os.path.getmtime(path))
+    )
+    conn.commit()
+
+
+def evict(
+    conn: sqlite3.Connection,
+    ttl_days: float | None = CACHE_TTL_DAYS,
+    max_entries: int | None = CACHE_MAX_ENTRIES
+) -> int:
+    """
+    Applies the cache eviction policy: expired entries are removed first,
+    except those of quarantined artists, which are served while they cannot
+    be re-queried, then the least recently used ones until at most
+    ``max_entries`` remain.
+
+    Args:
+        conn (sqlite3.Connection): Open cache connection.
+        ttl_days (float, optional): Entries older than this are deleted.
+        max_entries (int, optional): Maximum number of entries to keep.
+
+    Returns:
+        int: Number of evicted entries.
+    """
+    evicted = 0
+    if ttl_days is not None:
+        evicted += conn.execute(
+            """
+            DELETE FROM artist_cache
+            WHERE fetched_at < ? AND name NOT IN (SELECT name FROM quarantine)
+            """,
+            (time.time() - ttl_days * 86400,)
+        ).rowcount
+    if max_entries is not None:
+        evicted += conn.execute(
+            """
+            DELETE FROM artist_cache WHERE name IN (
+                SELECT name FROM artist_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (max_entries,)
+        ).rowcount
+    conn.commit()
+    if evicted:
+        logging.info(f"🧹 Evicted {evicted} Wikidata cache entries")
+    return evicted
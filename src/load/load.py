@@ -1,9 +1,9 @@
-import os
-import json
+import hashlib
 import logging
 import pandas as pd
-from sqlalchemy import create_engine
-from typing import Union
+from sqlalchemy import text
+
+from src.database import build_dsn, get_engine, load_credentials
 
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -14,34 +14,18 @@ def create_connection_string() -> str:
     """
     Constructs the PostgreSQL connection string from a JSON credentials file.
 
-    The function attempts to change directory to reach the location of the 
-    credentials file. Then, it reads the credentials and builds the 
-    SQLAlchemy-compatible connection string.
+    The load target is read from 'credentialsdb.json' (or the file in
+    ``WORKSHOP_LOAD_CREDENTIALS``), resolved by ``src.database`` without
+    changing the working directory.
 
     Returns:
         str: PostgreSQL connection string.
 
     Raises:
-        FileNotFoundError: If the directory or credentials file is not found.
+        FileNotFoundError: If the credentials file is not found.
         KeyError: If any required key is missing from the credentials.
     """
-    try:
-        os.chdir("../../Workshop_002")
-    except FileNotFoundError:
-        print("FileNotFoundError - Directory does not exist or wrong working path.")
-
-    os.chdir("..")
-    print(f"Current working directory: {os.getcwd()}")
-
-    with open("Workshop_002/credentialsdb.json", "r", encoding="utf-8") as file:
-        credentials = json.load(file)
-
-    db_host = credentials["db_host"]
-    db_name = credentials["db_name"]
-    db_user = credentials["db_user"]
-    db_password = credentials["db_password"]
-
-    return f"postgresql://{db_user}:{db_password}@{db_host}:5432/{db_name}"
+    return build_dsn(load_credentials(load=True))
 
 
 def load_to_postgresql(df: pd.DataFrame, table_name: str, if_exists: str = "replace") -> None:
@@ -57,9 +41,36 @@ def load_to_postgresql(df: pd.DataFrame, table_name: str, if_exists: str = "repl
     Returns:
         None
     """
-    conn_str = create_connection_string()
-    engine = create_engine(conn_str)
+    engine = get_engine(create_connection_string())
 
     log.info(f"Loading DataFrame into table '{table_name}' (mode: {if_exists})...")
     df.to_sql(table_name, engine, if_exists=if_exists, index=False)
     log.info("DataFrame successfully loaded into the database.")
+
+
+def publish_to_postgresql(df: pd.DataFrame, table_name: str, staging_suffix: str) -> None:
+    """
+    Replaces a PostgreSQL table atomically: the data is loaded into a
+    staging table first, which is then swapped in within one transaction.
+    Readers never see a missing or partially loaded table, and concurrent
+    runs (using different suffixes) do not overwrite each other's staging
+    data.
+
+    Args:
+        df (pd.DataFrame): DataFrame to upload.
+        table_name (str): Name of the destination table.
+        staging_suffix (str): Suffix identifying the run (e.g. the run id).
+
+    Returns:
+        None
+    """
+    engine = get_engine(create_connection_string())
+    suffix = hashlib.sha1(staging_suffix.encode("utf-8")).hexdigest()[:12]
+    staging_table = f"{table_name}__{suffix}"
+
+    log.info(f"Loading DataFrame into staging table '{staging_table}'...")
+    df.to_sql(staging_table, engine, if_exists="replace", index=False)
+    with engine.begin() as conn:
+        conn.execute(text(f'DROP TABLE IF EXISTS "{table_name}"'))
+        conn.execute(text(f'ALTER TABLE "{staging_table}" RENAME TO "{table_name}"'))
+    log.info(f"Table '{table_name}' published.")
@@ -0,0 +1,308 @@
+"""
+Pipeline stages and an in-process runner for the whole ETL flow.
+
+The Airflow DAG wraps the same stage functions, passing data between tasks
+through files; ``run_pipeline`` chains them in one process instead.
+
+Usage:
+    python -m src.pipeline --no-load --output merged.csv
+"""
+
+import os
+import sys
+import logging
+import argparse
+import tempfile
+import pandas as pd
+from datetime import datetime, timezone
+from functools import partial
+from typing import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.extract.extract_api import WIKIDATA_OFFLINE, extract_api as extract_api_data, extract_api_to_parquet
+from src.extract.extract_grammy import extract_changes, read_watermark, save_watermark
+from src.extract.extract_spotify import extract_spotify_data
+from src.transform.transform_api import transformation_api
+from src.transform.transform_grammy import update_grammy_store, GRAMMY_STORE_PATH
+from src.transform.transform_spotify import transform_spotify_data
+from src.transform.transform_spotify_chunked import SPOTIFY_CHUNKSIZE, transform_spotify_data_chunked
+from src.transform.merge import merge_datasets
+from src.load.load import publish_to_postgresql
+from src.storage import artifact_path, file_lock, read_frame
+from src.telemetry import METRICS_PATH, collect, instrument, measure, run_in_context, write_metrics
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+log = logging.getLogger(__name__)
+
+OUTPUT_TABLE = "data_pipeline"
+
+
+@instrument
+def extract_spotify() -> pd.DataFrame:
+    """
+    Extracts the Spotify dataset.
+
+    Returns:
+        pd.DataFrame: Raw Spotify data.
+
+    Raises:
+        ValueError: If the dataset is empty.
+    """
+    df = extract_spotify_data()
+    if df.empty:
+        raise ValueError("The Spotify DataFrame is empty.")
+    return df
+
+
+def extract_spotify_chunks(chunksize: int) -> Iterator[pd.DataFrame]:
+    """
+    Extracts the Spotify dataset in chunks. 'track_genre' is read as a
+    categorical per chunk, so it is handed on as plain strings for the
+    chunks to share one schema.
+
+    Args:
+        chunksize (int): Rows per chunk.
+
+    Yields:
+        pd.DataFrame: Raw Spotify data, chunk by chunk.
+    """
+    for chunk in extract_spotify_data(chunksize=chunksize):
+        chunk['track_genre'] = chunk['track_genre'].astype(object)
+        yield chunk
+
+
+@instrument
+def extract_grammy(since: str | None) -> tuple[pd.DataFrame, str | None]:
+    """
+    Extracts the Grammy rows changed after a watermark.
+
+    Args:
+        since (str, optional): Watermark of the last processed run, ``None``
+                               for a full extraction.
+
+    Returns:
+        tuple: The changed rows and the new watermark.
+
+    Raises:
+        ValueError: If a full extraction returns no rows.
+    """
+    df, watermark = extract_changes(since)
+    if df.empty and since is None:
+        raise ValueError("The Grammy DataFrame is empty.")
+    return df, watermark
+
+
+def grammy_since() -> str | None:
+    """
+    Returns the watermark to extract Grammy changes from: the stored one,
+    or ``None`` (full extraction) when there is no transformed store yet.
+    """
+    return read_watermark() if os.path.exists(GRAMMY_STORE_PATH) else None
+
+
+@instrument
+def extract_api(offline: bool = WIKIDATA_OFFLINE) -> pd.DataFrame:
+    """
+    Extracts the Wikidata attributes of the artists in memory.
+
+    Args:
+        offline (bool): Only use the local cache and seed files, without network access.
+
+    Returns:
+        pd.DataFrame: Raw Wikidata results.
+
+    Raises:
+        ValueError: If no results were returned.
+    """
+    df = extract_api_data(offline=offline)
+    if df.empty:
+        raise ValueError("The Wikidata DataFrame is empty.")
+    return df
+
+
+@instrument
+def extract_api_parts(parts_dir: str, offline: bool = WIKIDATA_OFFLINE) -> int:
+    """
+    Extracts the Wikidata attributes of the artists into resumable Parquet
+    parts (see ``extract_api_to_parquet``).
+
+    Args:
+        parts_dir (str): Directory holding the parts.
+        offline (bool): Only use the local cache and seed files, without network access.
+
+    Returns:
+        int: Number of rows written.
+
+    Raises:
+        ValueError: If no results were returned.
+    """
+    rows = extract_api_to_parquet(parts_dir, offline=offline)
+    if rows == 0:
+        raise ValueError("The Wikidata DataFrame is empty.")
+    return rows
+
+
+def transform_spotify(df: pd.DataFrame) -> pd.DataFrame:
+    """Cleans the raw Spotify data."""
+    return transform_spotify_data(df)
+
+
+def transform_spotify_chunked(chunks: Iterable[pd.DataFrame], output_path: str, work_dir: str) -> int:
+    """Cleans the raw Spotify data chunk by chunk into an artifact, in bounded memory."""
+    return transform_spotify_data_chunked(chunks, output_path, work_dir)
+
+
+def transform_grammy(df_changes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Merges the changed Grammy rows into the transformed store. Callers must
+    hold ``grammy_store_lock`` while running it and saving the watermark.
+
+    Args:
+        df_changes (pd.DataFrame): Raw Grammy rows changed since the watermark.
+
+    Returns:
+        pd.DataFrame: The full transformed Grammy dataset.
+    """
+    return update_grammy_store(df_changes)
+
+
+def grammy_store_lock():
+    """Returns the lock serialising updates of the shared Grammy store."""
+    return file_lock(GRAMMY_STORE_PATH)
+
+
+def transform_api(df: pd.DataFrame) -> pd.DataFrame:
+    """Cleans the raw Wikidata results."""
+    return transformation_api(df)
+
+
+def merge(df_spotify: pd.DataFrame, df_grammy: pd.DataFrame, df_api: pd.DataFrame) -> pd.DataFrame:
+    """Merges the three transformed datasets."""
+    return merge_datasets(df_spotify, df_grammy, df_api)
+
+
+@instrument
+def load(df: pd.DataFrame, run_id: str, table_name: str = OUTPUT_TABLE) -> None:
+    """
+    Publishes the merged dataset to PostgreSQL.
+
+    Args:
+        df (pd.DataFrame): Merged dataset.
+        run_id (str): Identifier of the run, used for the staging table.
+        table_name (str): Destination table.
+    """
+    publish_to_postgresql(df, table_name, run_id)
+
+
+def run_spotify_branch() -> pd.DataFrame:
+    """
+    Extracts and transforms the Spotify dataset, chunk by chunk through a
+    temporary directory when ``SPOTIFY_CHUNKSIZE`` is set.
+    """
+    if not SPOTIFY_CHUNKSIZE:
+        return transform_spotify(extract_spotify())
+    with tempfile.TemporaryDirectory() as work_dir:
+        output_path = artifact_path(work_dir, "spotify")
+        transform_spotify_chunked(extract_spotify_chunks(SPOTIFY_CHUNKSIZE), output_path, work_dir)
+        return read_frame(output_path)
+
+
+def run_grammy_branch() -> pd.DataFrame:
+    """Extracts the Grammy changes, updates the store and its watermark."""
+    with grammy_store_lock():
+        df_changes, watermark = extract_grammy(grammy_since())
+        df = transform_grammy(df_changes)
+        save_watermark(watermark)
+    return df
+
+
+def run_api_branch(offline: bool = WIKIDATA_OFFLINE) -> pd.DataFrame:
+    """Extracts and transforms the Wikidata results."""
+    return transform_api(extract_api(offline))
+
+
+BRANCHES = {
+    "spotify": run_spotify_branch,
+    "grammy": run_grammy_branch,
+    "api": run_api_branch
+}
+
+
+def run_pipeline(
+    max_workers: int = len(BRANCHES),
+    load_output: bool = True,
+    run_id: str | None = None,
+    metrics_path: str = METRICS_PATH,
+    offline: bool = WIKIDATA_OFFLINE
+) -> pd.DataFrame:
+    """
+    Runs extract, transform, merge and load in this process. The Spotify,
+    Grammy and API branches run concurrently in a thread pool and hand
+    their DataFrames to the merge in memory, without writing them to disk.
+    Branch and step metrics are appended to ``metrics_path``.
+
+    Args:
+        max_workers (int): Number of branches run at the same time.
+        load_output (bool): Whether to publish the result to PostgreSQL.
+        run_id (str, optional): Identifier of the run; a timestamp by default.
+        metrics_path (str): JSON Lines file receiving the metrics.
+        offline (bool): Serve the API branch from the local Wikidata cache
+                        and seed files only, without network access.
+
+    Returns:
+        pd.DataFrame: The merged dataset.
+    """
+    run_id = run_id or f"local__{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}"
+    branches = {**BRANCHES, "api": partial(run_api_branch, offline)}
+
+    with collect() as records:
+        try:
+            with measure("pipeline") as summary:
+                with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="branch") as executor:
+                    futures = {
+                        name: executor.submit(run_in_context(_measured_branch), name, branch)
+                        for name, branch in branches.items()
+                    }
+                    frames = {name: future.result() for name, future in futures.items()}
+
+                df_merged = merge(frames["spotify"], frames["grammy"], frames["api"])
+                if load_output:
+                    load(df_merged, run_id)
+                summary["rows_out"] = len(df_merged)
+        finally:
+            write_metrics(records, metrics_path, run_id=run_id, task="pipeline")
+
+    log.info(f"Pipeline {run_id} finished in {summary['wall_time_s']:.1f}s ({len(df_merged)} rows)")
+    return df_merged
+
+
+def _measured_branch(name: str, branch) -> pd.DataFrame:
+    """Runs a branch, recording it as a step of the pipeline."""
+    with measure(f"{name}_branch") as record:
+        df = branch()
+        record["rows_out"] = len(df)
+    return df
+
+
+def main(argv: list | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the ETL pipeline in a single process.")
+    parser.add_argument("--workers", type=int, default=len(BRANCHES),
+                        help="branches run concurrently (1 runs them one after another)")
+    parser.add_argument("--no-load", action="store_true", help="skip publishing to PostgreSQL")
+    parser.add_argument("--output", help="also write the merged dataset to this CSV file")
+    parser.add_argument("--run-id", help="identifier of the run (default: a timestamp)")
+    parser.add_argument("--offline", action="store_true", default=WIKIDATA_OFFLINE,
+                        help="query only the local Wikidata cache and seed files (or ETL_WIKIDATA_OFFLINE=1)")
+    args = parser.parse_args(argv)
+
+    df = run_pipeline(max_workers=args.workers, load_output=not args.no_load, run_id=args.run_id,
+                      offline=args.offline)
+    if args.output:
+        df.to_csv(args.output, index=False)
+        log.info(f"Merged dataset written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
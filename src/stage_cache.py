@@ -0,0 +1,198 @@
+""" Content-addressed cache of pipeline stage outputs. """
+
+import os
+import sys
+import time
+import types
+import shutil
+import hashlib
+import logging
+from typing import Callable
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+log = logging.getLogger(__name__)
+
+STAGE_CACHE_DIR = os.environ.get(
+    "ETL_STAGE_CACHE_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'cache', 'stages'))
+)
+STAGE_CACHE_ENABLED = os.environ.get("ETL_STAGE_CACHE", "1") != "0"
+# Entries kept per stage, and age (since last use) after which an entry is dropped.
+STAGE_CACHE_MAX_ENTRIES = int(os.environ.get("ETL_STAGE_CACHE_MAX_ENTRIES", "5"))
+STAGE_CACHE_MAX_AGE_DAYS = float(os.environ.get("ETL_STAGE_CACHE_MAX_AGE_DAYS", "30"))
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_fingerprint(path: str) -> str:
+    """
+    Hashes the content of a file.
+
+    Args:
+        path (str): File to hash.
+
+    Returns:
+        str: Hex SHA-256 digest of the file, or 'missing' if it does not exist.
+    """
+    if not os.path.exists(path):
+        return "missing"
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def code_fingerprint(*modules) -> str:
+    """
+    Hashes the source of the modules implementing a stage, and of every
+    ``src`` module they import (directly or through each other), so that
+    editing a transform or a helper it relies on invalidates the outputs it
+    produced.
+
+    Args:
+        *modules: Imported modules whose source files are hashed.
+
+    Returns:
+        str: Hex SHA-256 digest of the module sources.
+    """
+    seen = {}
+    pending = list(modules)
+    while pending:
+        module = pending.pop()
+        if module.__name__ in seen:
+            continue
+        seen[module.__name__] = module
+        pending.extend(_src_imports(module))
+    return stage_key(*(f"{name}:{file_fingerprint(seen[name].__file__)}" for name in sorted(seen)))
+
+
+def _src_imports(module: types.ModuleType) -> list:
+    """Returns the ``src`` modules a module imports, or imports names from."""
+    imported = []
+    for value in vars(module).values():
+        name = value.__name__ if isinstance(value, types.ModuleType) else getattr(value, "__module__", None)
+        if isinstance(name, str) and name.startswith("src.") and name in sys.modules:
+            imported.append(sys.modules[name])
+    return imported
+
+
+def stage_key(*parts) -> str:
+    """
+    Combines the fingerprints of a stage's inputs into a cache key.
+
+    Args:
+        *parts: Fingerprints or other values identifying the inputs
+                (converted with ``str``).
+
+    Returns:
+        str: Hex SHA-256 digest of the parts.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def run_cached(
+    stage: str,
+    key: str,
+    outputs: list,
+    compute: Callable[[], object],
+    cache_dir: str = STAGE_CACHE_DIR
+) -> bool:
+    """
+    Runs a stage unless an entry with the same key is cached. On a hit the
+    cached outputs are copied into place; on a miss ``compute`` runs and the
+    files it wrote are stored under the key.
+
+    Args:
+        stage (str): Stage name, used as the cache namespace.
+        key (str): Fingerprint of the stage inputs (see ``stage_key``).
+        outputs (list): Paths of the files written by ``compute``.
+        compute (Callable): Function producing the outputs.
+        cache_dir (str): Root directory of the cache.
+
+    Returns:
+        bool: True if the outputs were served from the cache.
+    """
+    if not STAGE_CACHE_ENABLED:
+        compute()
+        return False
+
+    entry_dir = os.path.join(cache_dir, stage, key)
+    if os.path.isdir(entry_dir):
+        try:
+            for path in outputs:
+                _copy_atomic(os.path.join(entry_dir, os.path.basename(path)), path)
+            os.utime(entry_dir)
+            log.info(f"Stage '{stage}' served from cache ({key[:12]})")
+            return True
+        except FileNotFoundError:
+            # Incomplete entry, or evicted by a concurrent run.
+            pass
+
+    compute()
+
+    tmp_dir = f"{entry_dir}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for path in outputs:
+        shutil.copyfile(path, os.path.join(tmp_dir, os.path.basename(path)))
+    shutil.rmtree(entry_dir, ignore_errors=True)
+    try:
+        os.replace(tmp_dir, entry_dir)
+        log.info(f"Stage '{stage}' cached ({key[:12]})")
+    except OSError:
+        # A concurrent run stored the same entry first.
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    evict(stage, cache_dir=cache_dir)
+    return False
+
+
+def evict(
+    stage: str,
+    max_entries: int = STAGE_CACHE_MAX_ENTRIES,
+    max_age_days: float = STAGE_CACHE_MAX_AGE_DAYS,
+    cache_dir: str = STAGE_CACHE_DIR
+) -> int:
+    """
+    Drops the entries of a stage not used within ``max_age_days``, then the
+    least recently used ones beyond ``max_entries``.
+
+    Args:
+        stage (str): Stage name.
+        max_entries (int): Entries to keep for the stage.
+        max_age_days (float): Maximum age since the last use, in days.
+        cache_dir (str): Root directory of the cache.
+
+    Returns:
+        int: Number of entries removed.
+    """
+    stage_dir = os.path.join(cache_dir, stage)
+    if not os.path.isdir(stage_dir):
+        return 0
+
+    entries = sorted(
+        (entry for entry in os.scandir(stage_dir) if entry.is_dir() and not entry.name.endswith(".tmp")),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True
+    )
+    cutoff = time.time() - max_age_days * 86400
+    stale = [
+        entry for i, entry in enumerate(entries)
+        if i >= max_entries or entry.stat().st_mtime < cutoff
+    ]
+    for entry in stale:
+        shutil.rmtree(entry.path, ignore_errors=True)
+    if stale:
+        log.info(f"Evicted {len(stale)} cached entries of stage '{stage}'")
+    return len(stale)
+
+
+def _copy_atomic(source: str, destination: str) -> None:
+    """Copies a file, moving it into place only once it is complete."""
+    tmp_path = f"{destination}.{os.getpid()}.tmp"
+    shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, destination)
@@ -0,0 +1,217 @@
+""" Intermediate storage for the DataFrames handed between pipeline stages. """
+
+import os
+import fcntl
+import logging
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.telemetry import instrument
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+log = logging.getLogger(__name__)
+
+# "arrow" (Arrow IPC file, uncompressed so it can be memory-mapped),
+# "parquet" (compressed, smaller on disk) or "csv" (legacy behaviour).
+INTERMEDIATE_FORMAT = os.environ.get("ETL_INTERMEDIATE_FORMAT", "arrow")
+EXTENSIONS = {
+    "arrow": ".arrow",
+    "parquet": ".parquet",
+    "csv": ".csv"
+}
+
+
+def artifact_path(directory: str, name: str, fmt: str = INTERMEDIATE_FORMAT) -> str:
+    """
+    Builds the path of an intermediate artifact.
+
+    Args:
+        directory (str): Directory holding the artifacts.
+        name (str): Artifact name without extension (e.g. 'spotify').
+        fmt (str): Storage format, one of ``EXTENSIONS``.
+
+    Returns:
+        str: Path with the extension of the format.
+    """
+    if fmt not in EXTENSIONS:
+        raise ValueError(f"Unknown intermediate format: {fmt}")
+    return os.path.join(directory, name + EXTENSIONS[fmt])
+
+
+def _format_of(path: str) -> str:
+    """Returns the storage format matching the extension of a path."""
+    for fmt, extension in EXTENSIONS.items():
+        if path.endswith(extension):
+            return fmt
+    raise ValueError(f"Unknown intermediate format for: {path}")
+
+
+@instrument
+def write_frame(df: pd.DataFrame, path: str) -> str:
+    """
+    Writes a DataFrame in the format given by the path extension. Dtypes
+    (including categoricals and booleans) are kept for the Arrow formats.
+
+    Args:
+        df (pd.DataFrame): Data to store.
+        path (str): Destination path.
+
+    Returns:
+        str: The destination path.
+    """
+    return write_frames([df], path)
+
+
+def write_frames(frames: Iterable[pd.DataFrame], path: str) -> str:
+    """
+    Streams a sequence of DataFrames with the same columns into one file,
+    holding a single frame in memory at a time. The file is written under a
+    temporary name and moved into place once complete.
+
+    Args:
+        frames (Iterable[pd.DataFrame]): Frames to append, in order.
+        path (str): Destination path.
+
+    Returns:
+        str: The destination path.
+    """
+    fmt = _format_of(path)
+    tmp_path = f"{path}.tmp"
+    writer = None
+    schema = None
+
+    try:
+        for i, df in enumerate(frames):
+            if fmt == "csv":
+                df.to_csv(tmp_path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+                continue
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if writer is None:
+                schema = table.schema
+                writer = pa.ipc.new_file(tmp_path, schema) if fmt == "arrow" else pq.ParquetWriter(tmp_path, schema)
+            elif not table.schema.equals(schema, check_metadata=False):
+                table = table.cast(schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if not os.path.exists(tmp_path):
+        raise ValueError(f"No data to write to {path}")
+    os.replace(tmp_path, path)
+    return path
+
+
+@instrument
+def read_frame(path: str, columns: list | None = None) -> pd.DataFrame:
+    """
+    Reads an intermediate artifact. Arrow IPC files are memory-mapped, so
+    their buffers are paged in from the OS cache instead of being parsed,
+    and numeric columns without nulls are handed to pandas without a copy.
+
+    Args:
+        path (str): Artifact path.
+        columns (list, optional): Subset of columns to read.
+
+    Returns:
+        pd.DataFrame: The stored data.
+    """
+    fmt = _format_of(path)
+    if fmt == "csv":
+        return pd.read_csv(path, usecols=columns)
+    if fmt == "parquet":
+        table = pq.read_table(path, columns=columns)
+    else:
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        if columns is not None:
+            table = table.select(columns)
+    return table.to_pandas(split_blocks=True)
+
+
+def iter_frames(path: str, batch_rows: int) -> Iterator[pd.DataFrame]:
+    """
+    Reads an intermediate artifact in batches, holding one batch in memory
+    at a time (Arrow IPC files are memory-mapped and sliced).
+
+    Args:
+        path (str): Artifact path.
+        batch_rows (int): Rows per batch.
+
+    Yields:
+        pd.DataFrame: The stored data, batch by batch.
+    """
+    fmt = _format_of(path)
+    if fmt == "csv":
+        yield from pd.read_csv(path, chunksize=batch_rows)
+        return
+    if fmt == "parquet":
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_rows):
+            yield pa.Table.from_batches([batch]).to_pandas()
+        return
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    for start in range(0, table.num_rows, batch_rows):
+        yield table.slice(start, batch_rows).to_pandas()
+
+
+def export_csv(path: str, csv_path: str) -> str:
+    """
+    Exports an intermediate artifact to CSV (e.g. for the Drive upload),
+    batch by batch for the Arrow formats.
+
+    Args:
+        path (str): Artifact path.
+        csv_path (str): Destination CSV path.
+
+    Returns:
+        str: The CSV path.
+    """
+    fmt = _format_of(path)
+    if fmt == "csv":
+        if os.path.abspath(path) != os.path.abspath(csv_path):
+            pd.read_csv(path).to_csv(csv_path, index=False)
+        return csv_path
+
+    if fmt == "parquet":
+        parquet_file = pq.ParquetFile(path)
+        return write_frames(_batch_frames(parquet_file.iter_batches(), parquet_file.schema_arrow), csv_path)
+
+    reader = pa.ipc.open_file(pa.memory_map(path, "r"))
+    batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    return write_frames(_batch_frames(batches, reader.schema), csv_path)
+
+
+def _batch_frames(batches: Iterable[pa.RecordBatch], schema: pa.Schema) -> Iterator[pd.DataFrame]:
+    """
+    Converts record batches to DataFrames. An artifact without rows has no
+    batches, so an empty frame of its schema is yielded instead, which
+    writes a CSV with only the header.
+    """
+    empty = True
+    for batch in batches:
+        empty = False
+        yield pa.Table.from_batches([batch]).to_pandas()
+    if empty:
+        yield schema.empty_table().to_pandas()
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """
+    Holds an exclusive lock on ``<path>.lock`` so that concurrent runs
+    serialise their read-modify-write of a shared file.
+
+    Args:
+        path (str): Path of the shared file.
+    """
+    lock_path = f"{path}.lock"
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    with open(lock_path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,205 @@
+""" Lightweight performance telemetry for pipeline tasks and transform steps. """
+
+import os
+import json
+import time
+import logging
+import resource
+import functools
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Iterator
+
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+log = logging.getLogger(__name__)
+
+METRICS_PATH = os.environ.get(
+    "ETL_METRICS_PATH",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'metrics', 'etl_metrics.jsonl'))
+)
+PROC_IO_PATH = "/proc/self/io"
+
+# Records of the current collection (None when nothing is being collected)
+# and the name of the enclosing measurement, used as the parent of a step.
+_records = contextvars.ContextVar("telemetry_records", default=None)
+_parent = contextvars.ContextVar("telemetry_parent", default=None)
+
+
+def _io_counters() -> tuple[int, int] | tuple[None, None]:
+    """
+    Returns the bytes read and written by the process through system calls
+    (files and sockets), or ``(None, None)`` where ``/proc`` is unavailable.
+    """
+    try:
+        with open(PROC_IO_PATH, "r") as file:
+            counters = dict(line.split(": ") for line in file.read().splitlines())
+        return int(counters["rchar"]), int(counters["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def _peak_rss_mb() -> float:
+    """Returns the peak resident set size of the process so far, in MiB."""
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _rows(value) -> int | None:
+    """Returns the number of rows of a DataFrame (or of the first element of a tuple)."""
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    return len(value) if isinstance(value, pd.DataFrame) else None
+
+
+@contextmanager
+def collect() -> Iterator[list]:
+    """
+    Starts collecting the measurements taken in this context (and in the
+    threads started with ``run_in_context``).
+
+    Yields:
+        list: The records, filled as measurements finish.
+    """
+    records = []
+    token = _records.set(records)
+    try:
+        yield records
+    finally:
+        _records.reset(token)
+
+
+@contextmanager
+def measure(name: str, rows_in: int | None = None) -> Iterator[dict | None]:
+    """
+    Measures a block: wall time, rows in/out, bytes read/written and the
+    peak RSS of the process at the end of the block. The I/O counters and
+    the RSS are process-wide, so blocks running concurrently in threads
+    share them.
+
+    Args:
+        name (str): Name of the measured task or step.
+        rows_in (int, optional): Number of input rows.
+
+    Yields:
+        dict or None: The record, where the block can set 'rows_out' or
+                      other fields; None if nothing is being collected.
+    """
+    records = _records.get()
+    if records is None:
+        yield None
+        return
+
+    record = {
+        "name": name,
+        "parent": _parent.get(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "rows_in": rows_in,
+        "rows_out": None
+    }
+    read_start, write_start = _io_counters()
+    token = _parent.set(name)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["wall_time_s"] = round(time.perf_counter() - start, 4)
+        _parent.reset(token)
+        read_end, write_end = _io_counters()
+        record["read_bytes"] = read_end - read_start if read_start is not None else None
+        record["write_bytes"] = write_end - write_start if write_start is not None else None
+        record["peak_rss_mb"] = _peak_rss_mb()
+        records.append(record)
+
+
+def instrument(func: Callable) -> Callable:
+    """
+    Decorates a pipeline step so that, while collecting, each call is
+    measured with the row counts of its first DataFrame argument and of its
+    result. Outside a collection the step runs unchanged.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _records.get() is None:
+            return func(*args, **kwargs)
+        rows_in = next((len(arg) for arg in args if isinstance(arg, pd.DataFrame)), None)
+        with measure(func.__name__, rows_in) as record:
+            result = func(*args, **kwargs)
+            record["rows_out"] = _rows(result)
+        return result
+    return wrapper
+
+
+def run_in_context(func: Callable) -> Callable:
+    """
+    Binds a callable to a copy of the current context, so that the steps it
+    runs in a worker thread are recorded in the caller's collection.
+    """
+    return functools.partial(contextvars.copy_context().run, func)
+
+
+def write_metrics(records: list, path: str = METRICS_PATH, **fields) -> None:
+    """
+    Appends records to a JSON Lines metrics file in a single write, so that
+    concurrent runs do not interleave their lines.
+
+    Args:
+        records (list): Records from ``collect``.
+        path (str): Metrics file.
+        **fields: Extra fields added to every record (e.g. run_id, task).
+    """
+    if not records:
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lines = "".join(json.dumps({**fields, **record}) + "\n" for record in records)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    try:
+        os.write(fd, lines.encode("utf-8"))
+    finally:
+        os.close(fd)
+
+
+def read_metrics(path: str = METRICS_PATH) -> pd.DataFrame:
+    """
+    Reads the metrics file, e.g. to compare a step across runs.
+
+    Args:
+        path (str): Metrics file.
+
+    Returns:
+        pd.DataFrame: One row per record.
+    """
+    return pd.read_json(path, lines=True)
+
+
+def instrument_task(task: Callable, path: str = METRICS_PATH) -> Callable:
+    """
+    Wraps an Airflow task callable: the task and every instrumented step it
+    runs are measured, appended to the metrics file and pushed to XCom
+    under the 'metrics' key.
+
+    Args:
+        task (Callable): Task function taking the Airflow context.
+        path (str): Metrics file.
+
+    Returns:
+        Callable: The wrapped task.
+    """
+    @functools.wraps(task)
+    def wrapper(**context):
+        with collect() as records:
+            try:
+                with measure(task.__name__):
+                    return task(**context)
+            finally:
+                write_metrics(records, path, run_id=context.get("run_id"), task=task.__name__)
+                summary = records[-1] if records else None
+                if summary is not None:
+                    log.info(
+                        f"{task.__name__}: {summary['wall_time_s']}s, "
+                        f"peak RSS {summary['peak_rss_mb']} MiB, {len(records) - 1} steps"
+                    )
+                    if "ti" in context:
+                        context["ti"].xcom_push(key="metrics", value=records)
+    return wrapper
@@ -0,0 +1,210 @@
+""" Row deduplication on 64-bit row fingerprints and integer-coded keys. """
+
+import logging
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+log = logging.getLogger(__name__)
+
+# Odd 64-bit constants used to mix the column hashes (from splitmix64).
+_MIX_MULTIPLIER = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_INCREMENT = np.uint64(0x9E3779B97F4A7C15)
+
+
+def hash_column(series: pd.Series) -> np.ndarray:
+    """
+    Hashes the values of a column to stable 64-bit integers (the same value
+    gives the same hash in every run). Values equal for ``drop_duplicates``
+    hash equally: -0.0 is folded into 0.0, every NaN into one NaN, and
+    categoricals are hashed by value rather than by code. Strings are hashed
+    directly: with mostly distinct values, as track ids and names are,
+    factorizing them first costs more than it saves.
+
+    Args:
+        series (pd.Series): Column to hash.
+
+    Returns:
+        np.ndarray: uint64 hash per row.
+    """
+    if pd.api.types.is_float_dtype(series.dtype):
+        values = series.to_numpy(dtype="float64", na_value=np.nan) + 0.0
+        values[np.isnan(values)] = np.nan
+        series = pd.Series(values)
+    return pd.util.hash_pandas_object(series, index=False, categorize=False).to_numpy()
+
+
+def combine_hashes(hashes: list) -> np.ndarray:
+    """
+    Combines per-column hashes into one order-dependent row fingerprint.
+
+    Args:
+        hashes (list): uint64 arrays of the same length, one per column.
+
+    Returns:
+        np.ndarray: uint64 fingerprint per row.
+    """
+    fingerprint = np.zeros(len(hashes[0]) if hashes else 0, dtype="uint64")
+    with np.errstate(over="ignore"):
+        for column_hash in hashes:
+            fingerprint = (fingerprint ^ column_hash) * _MIX_MULTIPLIER + _MIX_INCREMENT
+            fingerprint ^= fingerprint >> np.uint64(31)
+    return fingerprint
+
+
+def row_fingerprints(df: pd.DataFrame, subset: list | None = None) -> np.ndarray:
+    """
+    Computes a stable 64-bit fingerprint of each row over some columns.
+
+    Args:
+        df (pd.DataFrame): Data to fingerprint.
+        subset (list, optional): Columns to use, all by default.
+
+    Returns:
+        np.ndarray: uint64 fingerprint per row.
+    """
+    subset = list(df.columns) if subset is None else subset
+    return combine_hashes([hash_column(df[column]) for column in subset])
+
+
+def duplicated_by_fingerprint(fingerprints: np.ndarray, columns: list) -> np.ndarray:
+    """
+    Marks the rows whose fingerprint appeared on an earlier row, like
+    ``DataFrame.duplicated(keep='first')``. Each flagged row is compared
+    with the first row of its fingerprint, so a hash collision can never
+    drop a distinct row; in that (unlikely) case the exact pandas check is
+    used instead.
+
+    Args:
+        fingerprints (np.ndarray): Row fingerprints.
+        columns (list): The fingerprinted columns (pd.Series), aligned with
+                        ``fingerprints``, used to confirm the duplicates.
+
+    Returns:
+        np.ndarray: Boolean mask of the duplicated rows.
+    """
+    codes, _ = pd.factorize(fingerprints)
+    first_rows = np.flatnonzero(np.r_[True, codes[1:] > np.maximum.accumulate(codes)[:-1]]) if len(codes) else codes
+    duplicated = np.ones(len(codes), dtype=bool)
+    duplicated[first_rows] = False
+    if not duplicated.any():
+        return duplicated
+
+    rows = np.flatnonzero(duplicated)
+    references = first_rows[codes[rows]]
+    for series in columns:
+        left = series.take(rows).to_numpy()
+        right = series.take(references).to_numpy()
+        equal = (left == right) | (pd.isna(left) & pd.isna(right))
+        if not np.all(equal):
+            log.warning("Row fingerprint collision, falling back to an exact duplicate check")
+            return pd.DataFrame({i: series for i, series in enumerate(columns)}).duplicated().to_numpy()
+    return duplicated
+
+
+def drop_duplicate_rows(df: pd.DataFrame, subset: list | None = None) -> pd.DataFrame:
+    """
+    Drops the rows duplicated on ``subset`` keeping the first occurrence,
+    like ``df.drop_duplicates(subset)``, but compares one 64-bit fingerprint
+    per row instead of hashing wide object rows. A single column is checked
+    directly, as there is nothing to combine.
+
+    Args:
+        df (pd.DataFrame): Data to deduplicate.
+        subset (list, optional): Columns identifying a duplicate, all by default.
+
+    Returns:
+        pd.DataFrame: The first row of each group of duplicates, with the original index.
+    """
+    subset = list(df.columns) if subset is None else subset
+    if len(subset) == 1:
+        duplicated = df[subset[0]].duplicated().to_numpy()
+    else:
+        duplicated = duplicated_by_fingerprint(row_fingerprints(df, subset), [df[column] for column in subset])
+    return df[~duplicated] if duplicated.any() else df
+
+
+def factorize_column(series: pd.Series) -> tuple[np.ndarray, int]:
+    """
+    Encodes a column as integer codes numbered in sorted value order, so
+    that comparing or sorting the codes is the same as doing it on the
+    values (null values get -1).
+
+    Args:
+        series (pd.Series): Key column.
+
+    Returns:
+        tuple: The int64 codes and the number of distinct values.
+    """
+    codes, uniques = pd.factorize(series, sort=True)
+    return codes.astype("int64", copy=False), len(uniques)
+
+
+def combine_codes(codes: list) -> np.ndarray:
+    """
+    Combines the codes of several key columns into one int64 code per row,
+    ordered like the tuples of values (null in any column gives -1).
+
+    Args:
+        codes (list): ``(codes, cardinality)`` pairs from ``factorize_column``.
+
+    Returns:
+        np.ndarray: int64 key per row.
+    """
+    key, missing = None, None
+    for column_codes, cardinality in codes:
+        if key is None:
+            key, missing = column_codes.copy(), column_codes < 0
+            continue
+        if cardinality and key.max(initial=0) >= np.iinfo("int64").max // cardinality:
+            key = pd.factorize(key, sort=True)[0].astype("int64")
+        key = key * cardinality + column_codes
+        missing |= column_codes < 0
+    key[missing] = -1
+    return key
+
+
+def max_rows(keys: np.ndarray, values: pd.Series) -> np.ndarray:
+    """
+    Finds, for each key, the first row with the maximum value, ordered by
+    key, like ``groupby(keys)[values].idxmax()`` over a RangeIndex. A stable
+    sort on (key, -value) replaces the groupby, which pandas runs group by
+    group.
+
+    Args:
+        keys (np.ndarray): int64 keys from ``combine_codes`` (rows with -1 are skipped).
+        values (pd.Series): Numeric values to maximise, aligned with ``keys``.
+
+    Returns:
+        np.ndarray: Positions of the selected rows.
+    """
+    if pd.api.types.is_integer_dtype(values.dtype) or pd.api.types.is_bool_dtype(values.dtype):
+        descending = -values.to_numpy().astype("int64")
+    else:
+        descending = -values.to_numpy(dtype="float64", na_value=np.nan)
+    order = np.lexsort((descending, keys))
+    order = order[keys[order] >= 0]
+    sorted_keys = keys[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    return order[first]
+
+
+def keep_max_rows(df: pd.DataFrame, by: list, column: str) -> pd.DataFrame:
+    """
+    Keeps, for each group of ``by``, the first row with the maximum of
+    ``column``, like ``df.loc[df.groupby(by)[column].idxmax()]``. The key
+    columns are factorized into integer codes, so free-text keys group at
+    numeric speed.
+
+    Args:
+        df (pd.DataFrame): Data to filter.
+        by (list): Key columns.
+        column (str): Column to maximise.
+
+    Returns:
+        pd.DataFrame: One row per group, ordered by key, with the original index.
+    """
+    keys = combine_codes([factorize_column(df[key]) for key in by])
+    return df.iloc[max_rows(keys, df[column])]
+
@@ -0,0 +1,138 @@
+""" On-disk cache of the language detection of award names. """
+
+import os
+import sqlite3
+import logging
+from importlib import metadata
+
+from langdetect import DetectorFactory, detect
+from tqdm import tqdm
+
+LANGUAGE_CACHE_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'cache', 'award_languages.sqlite')
+)
+# langdetect samples the text at random: with a fixed seed the same text
+# always gets the same language, so cached and fresh results agree.
+DETECTOR_SEED = 0
+
+
+def _detector_version() -> str:
+    try:
+        version = metadata.version("langdetect")
+    except metadata.PackageNotFoundError:
+        version = "unknown"
+    return f"langdetect-{version}-seed{DETECTOR_SEED}"
+
+
+# Entries of another detector version (library upgrade or seed change) are
+# not used, so the cache never mixes results of different detectors.
+DETECTOR_VERSION = _detector_version()
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+def open_cache(path: str = LANGUAGE_CACHE_PATH) -> sqlite3.Connection:
+    """
+    Opens (and creates if needed) the on-disk language-detection cache.
+
+    Each entry is keyed by the exact award text and the detector version
+    (see ``DETECTOR_VERSION``) and stores the detected language code, or
+    'unknown' when detection failed.
+
+    Args:
+        path (str): Location of the SQLite database file.
+
+    Returns:
+        sqlite3.Connection: Open connection to the cache database.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS award_language (
+            text TEXT NOT NULL,
+            detector TEXT NOT NULL,
+            language TEXT NOT NULL,
+            PRIMARY KEY (text, detector)
+        )
+        """
+    )
+    conn.commit()
+    return conn
+
+
+def load_languages(conn: sqlite3.Connection, detector: str = DETECTOR_VERSION) -> dict:
+    """
+    Loads every cached language of a detector version in one query.
+
+    Args:
+        conn (sqlite3.Connection): Open cache connection.
+        detector (str): Detector version of the entries to load.
+
+    Returns:
+        dict: Mapping of award text to language code.
+    """
+    cursor = conn.execute("SELECT text, language FROM award_language WHERE detector = ?", [detector])
+    return dict(cursor)
+
+
+def put_languages(conn: sqlite3.Connection, languages: dict, detector: str = DETECTOR_VERSION) -> None:
+    """
+    Stores detected languages. Concurrent runs detect the same languages,
+    so an existing entry is kept.
+
+    Args:
+        conn (sqlite3.Connection): Open cache connection.
+        languages (dict): Mapping of award text to language code.
+        detector (str): Detector version that produced them.
+    """
+    if not languages:
+        return
+    conn.executemany(
+        "INSERT OR IGNORE INTO award_language (text, detector, language) VALUES (?, ?, ?)",
+        [(text, detector, language) for text, language in languages.items()]
+    )
+    conn.commit()
+
+
+def detect_language(text: str) -> str:
+    """
+    Detects the language of a text with the seeded detector.
+
+    Args:
+        text (str): Text to classify.
+
+    Returns:
+        str: Language code, or 'unknown' if langdetect cannot classify it.
+    """
+    DetectorFactory.seed = DETECTOR_SEED
+    try:
+        return detect(text)
+    except Exception:
+        return "unknown"
+
+
+def detect_languages(texts, path: str = LANGUAGE_CACHE_PATH) -> dict:
+    """
+    Returns the language of each text, loading the cache in bulk and
+    running the detector only for the texts it does not hold yet, which are
+    then added to it.
+
+    Args:
+        texts (Iterable[str]): Texts to classify.
+        path (str): Location of the SQLite database file.
+
+    Returns:
+        dict: Mapping of text to language code, for every text given.
+    """
+    conn = open_cache(path)
+    try:
+        cached = load_languages(conn)
+        unseen = sorted({text for text in texts if text not in cached})
+        logging.info(f"Language cache: {len(cached)} entries loaded, {len(unseen)} texts to detect")
+        detected = {text: detect_language(text) for text in tqdm(unseen, desc="Detecting award languages")}
+        put_languages(conn, detected)
+    finally:
+        conn.close()
+    return {**cached, **detected}
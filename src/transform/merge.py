@@ -3,10 +3,14 @@ import logging
 import re
 from typing import Union
 
+from src.telemetry import instrument
+from src.transform.dedup import drop_duplicate_rows
+
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 log = logging.getLogger(__name__)
 
 
+@instrument
 def expand_artists_column(df: pd.DataFrame, column: str = "artist") -> pd.DataFrame:
     """
     Expands rows with multiple artists in the specified column by splitting on common collaboration patterns.
@@ -33,6 +37,7 @@ def expand_artists_column(df: pd.DataFrame, column: str = "artist") -> pd.DataFr
     return df_expanded
 
 
+@instrument
 def normalize_artist_names(df: pd.DataFrame, column: str = "artist") -> pd.DataFrame:
     """
     Normalizes artist names by stripping and converting to lowercase.
@@ -49,6 +54,7 @@ def normalize_artist_names(df: pd.DataFrame, column: str = "artist") -> pd.DataF
     return df
 
 
+@instrument
 def merge_datasets(
     df_spotify: pd.DataFrame,
     df_grammy: pd.DataFrame,
@@ -89,7 +95,7 @@ def merge_datasets(
         suffixes=('', '_wikidata')
     )
 
-    final_merged = final_merged.drop_duplicates(subset=['track_id', 'artist'], keep='first')
+    final_merged = drop_duplicate_rows(final_merged, ['track_id', 'artist'])
     final_merged = final_merged.dropna().reset_index(drop=True)
 
     log.info(f"Merge completed: {len(final_merged)} rows returned.")
@@ -0,0 +1,283 @@
+""" Lazy, fused execution of row filters, dedups and column derivations. """
+
+import logging
+import numpy as np
+import pandas as pd
+from typing import Callable
+
+from src.telemetry import measure
+from src.transform.dedup import (
+    hash_column, combine_hashes, duplicated_by_fingerprint, factorize_column, combine_codes, max_rows
+)
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+log = logging.getLogger(__name__)
+
+
+class TransformPlan:
+    """
+    A sequence of DataFrame operations registered lazily and run by
+    ``execute``, which gives the same result as applying them one by one
+    with pandas but copies the data once instead of after every step.
+
+    Row operations (``dropna``, ``drop_duplicates``, ``keep_max``) only
+    narrow or reorder an array of row positions into the input frame.
+    Derived columns are computed when a row operation first needs them, or
+    otherwise once at the end on the surviving rows, and
+    ``drop_columns`` only edits the list of output columns. The output is
+    assembled with a single take and a fresh RangeIndex, so the
+    ``reset_index(drop=True)`` calls between pandas steps are unnecessary.
+    """
+
+    def __init__(self):
+        self.operations = []
+
+    def drop_columns(self, columns: list, name: str = "drop_columns") -> "TransformPlan":
+        """Removes columns from the output (missing columns are ignored)."""
+        self.operations.append(("drop_columns", name, list(columns)))
+        return self
+
+    def dropna(self, subset: list | None = None, name: str = "dropna") -> "TransformPlan":
+        """
+        Keeps the rows without nulls in ``subset`` (default: current
+        columns). Columns of ``subset`` missing from the input are ignored.
+        """
+        self.operations.append(("dropna", name, None if subset is None else list(subset)))
+        return self
+
+    def astype(self, dtypes: dict, name: str = "astype") -> "TransformPlan":
+        """
+        Casts columns to the given dtypes, like ``derive`` with
+        ``Series.astype``. Columns missing from the input are ignored.
+        """
+        self.operations.append(("astype", name, dict(dtypes)))
+        return self
+
+    def drop_duplicates(self, subset: list | None = None, name: str = "drop_duplicates") -> "TransformPlan":
+        """Keeps the first row of each group of duplicates on ``subset`` (default: current columns)."""
+        self.operations.append(("drop_duplicates", name, None if subset is None else list(subset)))
+        return self
+
+    def drop_duplicates_except(self, excluded: list, name: str = "drop_duplicates") -> "TransformPlan":
+        """Like ``drop_duplicates`` on every current column but ``excluded``."""
+        self.operations.append(("drop_duplicates_except", name, list(excluded)))
+        return self
+
+    def keep_max(self, by: list, column: str, name: str = "keep_max") -> "TransformPlan":
+        """
+        Keeps, for each group of ``by``, the first row with the maximum of
+        ``column``, ordered by group key like ``groupby(by)[column].idxmax()``.
+        """
+        self.operations.append(("keep_max", name, (list(by), column)))
+        return self
+
+    def derive(self, column: str, func: Callable, inputs: list, name: str = "derive") -> "TransformPlan":
+        """
+        Sets ``column`` (replacing it in place or appending it) to
+        ``func(*input_series)``. ``func`` must be element-wise.
+        """
+        return self.derive_many([column], lambda *series: {column: func(*series)}, inputs, name)
+
+    def derive_many(self, columns: list, func: Callable, inputs: list, name: str = "derive") -> "TransformPlan":
+        """
+        Sets several columns at once from the mapping returned by
+        ``func(*input_series)``, e.g. to compute them in one vectorised pass.
+        """
+        self.operations.append(("derive", name, (list(columns), func, list(inputs))))
+        return self
+
+    def execute(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Runs the plan on a DataFrame.
+
+        Args:
+            df (pd.DataFrame): Input data; it is not modified.
+
+        Returns:
+            pd.DataFrame: The result, with a RangeIndex.
+        """
+        operations = _collapse_dedups(_bind(self.operations, list(df.columns)))
+        log.info(f"Executing transform plan: {len(self.operations)} operations, {len(operations)} after fusing")
+        return _PlanRun(df).run(operations)
+
+
+def _bind(operations: list, columns: list) -> list:
+    """
+    Resolves the column sets of the operations against the columns present
+    at each point of the plan, so the optimiser can compare them.
+    """
+    columns = list(columns)
+    bound = []
+    for kind, name, args in operations:
+        if kind == "drop_columns":
+            columns = [column for column in columns if column not in args]
+        elif kind == "dropna":
+            args = list(columns) if args is None else [column for column in args if column in columns]
+        elif kind == "drop_duplicates":
+            kind, args = "drop_duplicates", list(columns) if args is None else args
+        elif kind == "drop_duplicates_except":
+            kind, args = "drop_duplicates", [column for column in columns if column not in args]
+        elif kind == "astype":
+            dtypes = {column: dtype for column, dtype in args.items() if column in columns}
+            kind, args = "derive", (list(dtypes), _caster(dtypes), list(dtypes))
+        elif kind == "derive":
+            columns.extend(column for column in args[0] if column not in columns)
+        bound.append((kind, name, args))
+    bound.append(("output", "output", columns))
+    return bound
+
+
+def _caster(dtypes: dict) -> Callable:
+    """Returns the ``derive_many`` function of an ``astype`` operation."""
+    return lambda *series: {
+        column: values.astype(dtype) for (column, dtype), values in zip(dtypes.items(), series)
+    }
+
+
+def _collapse_dedups(operations: list) -> list:
+    """
+    Drops a dedup immediately followed by a dedup on a subset of its
+    columns: keeping the first row per key of the narrower subset also
+    removes every duplicate of the wider one, so the first pass is
+    redundant.
+    """
+    collapsed = []
+    for operation in operations:
+        if (
+            collapsed
+            and operation[0] == "drop_duplicates"
+            and collapsed[-1][0] == "drop_duplicates"
+            and set(operation[2]) <= set(collapsed[-1][2])
+        ):
+            collapsed.pop()
+        collapsed.append(operation)
+    return collapsed
+
+
+class _PlanRun:
+    """State of one execution: surviving row positions and derived columns."""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.rows = None
+        self.sources = {column: ("base", column) for column in df.columns}
+        self.derivations = []
+        self.values = {}
+        self.hashes = {}
+        self.codes = {}
+        self.unique = set()
+
+    def run(self, operations: list) -> pd.DataFrame:
+        for kind, name, args in operations:
+            if kind == "output":
+                return self._output(args)
+            with measure(name, self._row_count()) as record:
+                if kind == "drop_columns":
+                    for column in args:
+                        self.sources.pop(column, None)
+                elif kind == "derive":
+                    columns, func, inputs = args
+                    self.derivations.append((func, [self.sources[column] for column in inputs]))
+                    for column in columns:
+                        self.sources[column] = ("derived", (len(self.derivations) - 1, column))
+                        self.unique.discard(column)
+                else:
+                    getattr(self, f"_{kind}")(args)
+                if record is not None:
+                    record["rows_out"] = self._row_count()
+
+    def _row_count(self) -> int:
+        return len(self.df) if self.rows is None else len(self.rows)
+
+    def _value(self, source: tuple) -> pd.Series:
+        """Returns a base or derived column at the surviving rows, with a RangeIndex."""
+        kind, key = source
+        if kind == "derived":
+            if key not in self.values:
+                index, _ = key
+                func, inputs = self.derivations[index]
+                for column, result in func(*(self._value(source) for source in inputs)).items():
+                    series = result if isinstance(result, pd.Series) else pd.Series(result)
+                    series.index = pd.RangeIndex(len(series))
+                    self.values[(index, column)] = series
+            return self.values[key]
+        series = self.df[key]
+        series = series.copy(deep=False) if self.rows is None else series.take(self.rows)
+        series.index = pd.RangeIndex(len(series))
+        return series
+
+    def _column(self, column: str) -> pd.Series:
+        return self._value(self.sources[column])
+
+    def _hash(self, column: str) -> np.ndarray:
+        """Returns the 64-bit hashes of a column at the surviving rows, computed once per column."""
+        source = self.sources[column]
+        if source not in self.hashes:
+            self.hashes[source] = hash_column(self._value(source))
+        return self.hashes[source]
+
+    def _codes(self, column: str) -> tuple[np.ndarray, int]:
+        """Returns the sorted-order integer codes of a key column at the surviving rows, factorized once."""
+        source = self.sources[column]
+        if source not in self.codes:
+            self.codes[source] = factorize_column(self._value(source))
+        return self.codes[source]
+
+    def _narrow(self, positions: np.ndarray) -> None:
+        """Keeps the rows at ``positions`` (relative to the surviving rows), in that order."""
+        self.rows = positions if self.rows is None else self.rows[positions]
+        for key, series in self.values.items():
+            series = series.take(positions)
+            series.index = pd.RangeIndex(len(series))
+            self.values[key] = series
+        for key, hashes in self.hashes.items():
+            self.hashes[key] = hashes[positions]
+        for key, (codes, cardinality) in self.codes.items():
+            self.codes[key] = (codes[positions], cardinality)
+
+    def _dropna(self, columns: list) -> None:
+        mask = None
+        for column in columns:
+            missing = self._column(column).isna().to_numpy()
+            mask = missing if mask is None else mask | missing
+        if mask is not None and mask.any():
+            self._narrow(np.flatnonzero(~mask))
+
+    def _drop_duplicates(self, subset: list) -> None:
+        # A column that is unique over the surviving rows makes every row
+        # distinct on the subset; integer keys are cheap to check.
+        for column in subset:
+            if column in self.unique:
+                return
+            series = self._column(column)
+            if pd.api.types.is_integer_dtype(series.dtype) and series.is_unique:
+                return
+        if len(subset) == 1:
+            duplicated = self._column(subset[0]).duplicated().to_numpy()
+        else:
+            # Dedups share the column hashes, so each column is hashed once
+            # per plan however many dedups use it.
+            fingerprints = combine_hashes([self._hash(column) for column in subset])
+            duplicated = duplicated_by_fingerprint(fingerprints, [self._column(column) for column in subset])
+        if duplicated.any():
+            self._narrow(np.flatnonzero(~duplicated))
+        if len(subset) == 1:
+            self.unique.add(subset[0])
+
+    def _keep_max(self, args: tuple) -> None:
+        by, column = args
+        keys = combine_codes([self._codes(key) for key in by])
+        self._narrow(max_rows(keys, self._column(column)))
+
+    def _output(self, columns: list) -> pd.DataFrame:
+        """Assembles the output columns with one take of the base columns."""
+        base_columns = [column for column in columns if self.sources[column][0] == "base"]
+        positions = [self.df.columns.get_loc(self.sources[column][1]) for column in base_columns]
+        rows = slice(None) if self.rows is None else self.rows
+        out = self.df.iloc[rows, positions]
+        out.columns = base_columns
+        out.index = pd.RangeIndex(len(out))
+        for position, column in enumerate(columns):
+            if self.sources[column][0] == "derived":
+                out.insert(position, column, self._column(column))
+        return out
@@ -1,6 +1,7 @@
 import pandas as pd
-from langdetect import detect
-from tqdm import tqdm
+
+from src.telemetry import instrument
+from src.transform.language_cache import detect_language, detect_languages
 
 NO_ENGLISH_WORDS = [
     "stär um", "para", "prêmio", "premio", "prix", "voor", "de", "sus", "la", "das", "del", "der", "des",
@@ -9,8 +10,20 @@ NO_ENGLISH_WORDS = [
     "kpakpando", "stäär üüb"
 ]
 
+# Languages of the award texts, filled in bulk from the on-disk cache by
+# warm_award_languages.
 award_lang_cache = {}
 
+def warm_award_languages(awards):
+    """
+    Loads the languages of the given awards into ``award_lang_cache`` from
+    the on-disk cache, detecting only the awards it has not seen.
+
+    Args:
+        awards (Iterable[str]): Award names.
+    """
+    award_lang_cache.update(detect_languages(awards))
+
 def is_english_filtered(text):
     """
     Detects if the input text is in English and does not contain keywords from other languages.
@@ -23,10 +36,7 @@ def is_english_filtered(text):
     """
     text_l = str(text).lower().strip()
     if text not in award_lang_cache:
-        try:
-            award_lang_cache[text] = detect(text)
-        except Exception:
-            award_lang_cache[text] = "unknown"
+        award_lang_cache[text] = detect_language(text)
 
     if award_lang_cache[text] != "en":
         return False
@@ -50,6 +60,23 @@ def most_common_value(series):
     else:
         return "Unknown"
 
+@instrument
+def normalize_raw_api(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Gives the raw Wikidata rows the types they have after a CSV round-trip:
+    empty strings become missing values and 'album_count' becomes numeric.
+
+    Args:
+        df (pd.DataFrame): Raw input data as produced by the API extract.
+
+    Returns:
+        pd.DataFrame: Normalized data.
+    """
+    df = df.replace({column: {"": None} for column in ["artist", "country", "award", "gender"]})
+    df["album_count"] = pd.to_numeric(df["album_count"])
+    return df
+
+@instrument
 def transformation_api(df: pd.DataFrame) -> pd.DataFrame:
     """
     Transforms an artist dataset by cleaning and aggregating awards and attributes per artist.
@@ -60,9 +87,12 @@ def transformation_api(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         pd.DataFrame: Cleaned and aggregated dataset by artist.
     """
+    df = normalize_raw_api(df)
     df_valid_awards = df[df['award'].notna()].copy()
-    tqdm.pandas(desc="Filtering valid awards")
-    df_valid_awards = df_valid_awards[df_valid_awards['award'].progress_apply(is_english_filtered)]
+    awards = df_valid_awards['award'].unique()
+    warm_award_languages(awards)
+    english = {award: is_english_filtered(award) for award in awards}
+    df_valid_awards = df_valid_awards[df_valid_awards['award'].map(english).astype(bool)]
 
     grouped_awards = df_valid_awards.groupby("artist")["award"].apply(lambda x: sorted(set(x))).reset_index()
     grouped_awards["award_count"] = grouped_awards["award"].apply(len)
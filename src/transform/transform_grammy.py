@@ -1,15 +1,62 @@
 """ Transform Grammy data for analysis. """
 
+import os
+import numpy as np
 import pandas as pd
 import logging
 import re
 
+from src.telemetry import instrument, measure
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
+GRAMMY_STORE_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'cache', 'grammy_transformed.parquet')
+)
+GRAMMY_KEY = ['year', 'category', 'nominee']
+
+# Patterns of the artist imputation, anchored with '^' where the rule
+# matches from the start of 'workers'.
+PARENTHESIS_PATTERN = re.compile(r'\((.*?)\)')
+ROLE_PATTERN = re.compile(r"^([^,;]+), (?:soloist|composer|conductor|artist)")
+COLLABORATION_PATTERN = re.compile(r"^(.+?(?:Featuring|&| and ).*?)(?:;|,|$)", re.IGNORECASE)
+NON_ESSENTIAL_CATEGORIES = [
+    'Best Small Ensemble Performance (With or Without Conductor)',
+    'Best Classical Vocal Performance',
+    'Best Classical Vocal Soloist Performance',
+    'Best Classical Performance - Instrumental Soloist or Soloists (With or Without Orchestra)',
+    'Best Classical Performance - Vocal Soloist',
+    'Best Performance - Instrumental Soloist or Soloists (With or Without Orchestra)',
+    'Best Classical Performance - Vocal Soloist (With or Without Orchestra)'
+]
+ARTIST_REPLACEMENTS = {'(Various Artists)': 'Various Artists'}
+UNUSED_COLUMNS = ['published_at', 'updated_at', 'img', 'workers']
+
+
+def artist_from_parenthesis(workers: pd.Series) -> pd.Series:
+    """Extracts the text of the first parenthesis of 'workers' (NaN without one)."""
+    return workers.astype(object).str.extract(PARENTHESIS_PATTERN, expand=False)
+
+
+def artist_from_roles(workers: pd.Series) -> pd.Series:
+    """
+    Extracts the artist from the credits of 'workers': the name before a
+    soloist/composer/conductor/artist role, else the leading collaboration
+    ('Featuring', '&' or 'and'), else the whole text.
+    """
+    workers = workers.astype(object)
+    return (
+        workers.str.extract(ROLE_PATTERN, expand=False)
+        .fillna(workers.str.extract(COLLABORATION_PATTERN, expand=False))
+        .fillna(workers)
+        .str.strip()
+    )
+
 
+@instrument
 def drop_null_nominees(df: pd.DataFrame) -> pd.DataFrame:
     """Drop rows with null values in the 'nominee' column.
 
@@ -23,6 +70,7 @@ def drop_null_nominees(df: pd.DataFrame) -> pd.DataFrame:
     return df.dropna(subset=['nominee'])
 
 
+@instrument
 def drop_nulls_in_nonessential_categories(df: pd.DataFrame) -> pd.DataFrame:
     """Drop rows with null values in non-essential award categories.
 
@@ -33,24 +81,15 @@ def drop_nulls_in_nonessential_categories(df: pd.DataFrame) -> pd.DataFrame:
         pd.DataFrame: Cleaned DataFrame.
     """
     logging.info("Dropping rows with null values in non-essential categories")
-    non_essential_categories = [
-        'Best Small Ensemble Performance (With or Without Conductor)',
-        'Best Classical Vocal Performance',
-        'Best Classical Vocal Soloist Performance',
-        'Best Classical Performance - Instrumental Soloist or Soloists (With or Without Orchestra)',
-        'Best Classical Performance - Vocal Soloist',
-        'Best Performance - Instrumental Soloist or Soloists (With or Without Orchestra)',
-        'Best Classical Performance - Vocal Soloist (With or Without Orchestra)'
-    ]
-
     mask = (
         df['artist'].isnull() &
         df['workers'].isnull() &
-        df['category'].isin(non_essential_categories)
+        df['category'].isin(NON_ESSENTIAL_CATEGORIES)
     )
     return df[~mask].reset_index(drop=True)
 
 
+@instrument
 def impute_artist_from_nominee(df: pd.DataFrame) -> pd.DataFrame:
     """Fill missing 'artist' values using the 'nominee' column when appropriate.
 
@@ -66,6 +105,7 @@ def impute_artist_from_nominee(df: pd.DataFrame) -> pd.DataFrame:
     return df.reset_index(drop=True)
 
 
+@instrument
 def impute_artist_from_parenthesis(df: pd.DataFrame) -> pd.DataFrame:
     """Extract artist names from parentheses in the 'workers' column.
 
@@ -76,18 +116,12 @@ def impute_artist_from_parenthesis(df: pd.DataFrame) -> pd.DataFrame:
         pd.DataFrame: Updated DataFrame.
     """
     logging.info("Imputing 'artist' values from parentheses in 'workers'")
-
-    def extract_from_parentheses(workers):
-        match = re.search(r'\((.*?)\)', str(workers))
-        return match.group(1) if match else None
-
-    df["artist"] = df.apply(
-        lambda row: extract_from_parentheses(row["workers"]) if pd.isna(row["artist"]) else row["artist"],
-        axis=1
-    )
+    missing = df['artist'].isna()
+    df.loc[missing, 'artist'] = artist_from_parenthesis(df.loc[missing, 'workers'])
     return df.reset_index(drop=True)
 
 
+@instrument
 def impute_artist_from_roles(df: pd.DataFrame) -> pd.DataFrame:
     """Impute missing 'artist' values by extracting them from roles in the 'workers' column.
 
@@ -98,22 +132,12 @@ def impute_artist_from_roles(df: pd.DataFrame) -> pd.DataFrame:
         pd.DataFrame: Updated DataFrame.
     """
     logging.info("Imputing missing 'artist' values using roles in 'workers'")
-
-    def extract_artist(workers):
-        if pd.isnull(workers):
-            return None
-        match = re.match(r"([^,;]+), (soloist|composer|conductor|artist)", workers)
-        if match:
-            return match.group(1).strip()
-        match = re.match(r"(.+?(Featuring|&| and ).*?)(;|,|$)", workers, re.IGNORECASE)
-        if match:
-            return match.group(1).strip()
-        return workers.strip()
-
-    df['artist'] = df['artist'].fillna(df['workers'].apply(extract_artist))
+    missing = df['artist'].isna()
+    df.loc[missing, 'artist'] = artist_from_roles(df.loc[missing, 'workers'])
     return df.reset_index(drop=True)
 
 
+@instrument
 def replace_artist_values(df: pd.DataFrame) -> pd.DataFrame:
     """Replace specific values in the 'artist' column.
 
@@ -124,10 +148,11 @@ def replace_artist_values(df: pd.DataFrame) -> pd.DataFrame:
         pd.DataFrame: Updated DataFrame.
     """
     logging.info("Replacing specific artist values")
-    df['artist'] = df['artist'].replace({'(Various Artists)': 'Various Artists'})
+    df['artist'] = df['artist'].replace(ARTIST_REPLACEMENTS)
     return df.reset_index(drop=True)
 
 
+@instrument
 def rename_columns(df: pd.DataFrame) -> pd.DataFrame:
     """Rename columns to standardize naming.
 
@@ -141,6 +166,7 @@ def rename_columns(df: pd.DataFrame) -> pd.DataFrame:
     return df.rename(columns={'winner': 'nominated'}).reset_index(drop=True)
 
 
+@instrument
 def drop_unused_columns(df: pd.DataFrame) -> pd.DataFrame:
     """Drop unnecessary columns from the DataFrame.
 
@@ -151,12 +177,58 @@ def drop_unused_columns(df: pd.DataFrame) -> pd.DataFrame:
         pd.DataFrame: Cleaned DataFrame.
     """
     logging.info("Dropping unused columns")
-    return df.drop(columns=['published_at', 'updated_at', 'img', 'workers'], axis=1).reset_index(drop=True)
+    return df.drop(columns=UNUSED_COLUMNS, axis=1, errors='ignore').reset_index(drop=True)
+
+
+# Imputation stages of the missing 'artist' values, in order: name, then a
+# function of the candidate rows returning their artist (NaN if not found).
+ARTIST_IMPUTATIONS = [
+    ("impute_artist_from_nominee", lambda rows: rows['nominee'].where(rows['workers'].isnull())),
+    ("impute_artist_from_parenthesis", lambda rows: artist_from_parenthesis(rows['workers'])),
+    ("impute_artist_from_roles", lambda rows: artist_from_roles(rows['workers']))
+]
+
+
+def impute_artist(df: pd.DataFrame, artist: np.ndarray) -> np.ndarray:
+    """
+    Runs the ``ARTIST_IMPUTATIONS`` stages over a single mask of the rows
+    whose artist is still missing. Each stage only reads and writes the rows
+    left in the mask, and the stages stop once it is empty. The rows filled
+    by each stage are logged and recorded as 'rows_filled' of its metrics.
 
+    Args:
+        df (pd.DataFrame): Grammy rows, read only.
+        artist (np.ndarray): Object array of the 'artist' values, filled in place.
 
+    Returns:
+        np.ndarray: The filled 'artist' values.
+    """
+    missing = pd.isna(artist)
+    for name, stage in ARTIST_IMPUTATIONS:
+        rows = np.flatnonzero(missing)
+        if len(rows) == 0:
+            break
+        with measure(name, len(rows)) as record:
+            values = stage(df.take(rows)).to_numpy(dtype=object)
+            filled = ~pd.isna(values)
+            artist[rows[filled]] = values[filled]
+            missing[rows[filled]] = False
+            if record is not None:
+                record["rows_out"] = len(rows)
+                record["rows_filled"] = int(filled.sum())
+        logging.info(f"{name}: filled {filled.sum()} of {len(rows)} missing artists")
+    return artist
+
+
+@instrument
 def transform_grammy_data(df: pd.DataFrame) -> pd.DataFrame:
     """Apply all transformation steps to prepare Grammy data for analysis.
 
+    Gives the same result as ``transform_grammy_data_stepwise`` in one
+    pass: the row filters are combined into one mask, the artist imputation
+    only touches the rows still missing an artist (see ``impute_artist``),
+    and the output is assembled with a single copy of the kept rows.
+
     Args:
         df (pd.DataFrame): Raw Grammy data.
 
@@ -165,6 +237,34 @@ def transform_grammy_data(df: pd.DataFrame) -> pd.DataFrame:
     """
     logging.info("Starting transformation of Grammy data")
 
+    no_artist = df['artist'].isnull() & df['workers'].isnull()
+    keep = df['nominee'].notnull() & ~(no_artist & df['category'].isin(NON_ESSENTIAL_CATEGORIES))
+    rows = np.flatnonzero(keep.to_numpy())
+    kept = df[['nominee', 'workers']].take(rows)
+
+    artist = impute_artist(kept, df['artist'].to_numpy()[rows].astype(object))
+    for value, replacement in ARTIST_REPLACEMENTS.items():
+        artist[artist == value] = replacement
+
+    columns = [column for column in df.columns if column not in UNUSED_COLUMNS]
+    out = df.iloc[rows, [df.columns.get_loc(column) for column in columns]]
+    out.index = pd.RangeIndex(len(out))
+    out['artist'] = artist
+    out = out.rename(columns={'winner': 'nominated'})
+    out['decade'] = (out['year'] // 10) * 10
+    return out
+
+
+@instrument
+def transform_grammy_data_stepwise(df: pd.DataFrame) -> pd.DataFrame:
+    """Reference implementation of ``transform_grammy_data``, one helper at a time.
+
+    Args:
+        df (pd.DataFrame): Raw Grammy data.
+
+    Returns:
+        pd.DataFrame: Cleaned and transformed data.
+    """
     df = drop_null_nominees(df)
     df = drop_nulls_in_nonessential_categories(df)
     df = impute_artist_from_nominee(df)
@@ -176,3 +276,39 @@ def transform_grammy_data(df: pd.DataFrame) -> pd.DataFrame:
     df['decade'] = (df['year'] // 10) * 10
 
     return df.reset_index(drop=True)
+
+
+@instrument
+def update_grammy_store(df_changes: pd.DataFrame, store_path: str = GRAMMY_STORE_PATH) -> pd.DataFrame:
+    """Merge changed raw Grammy rows into the persisted transformed dataset.
+
+    Every transform step works row by row, so transforming only the changed
+    rows gives the same result as transforming the whole table. Stored rows
+    sharing a (year, category, nominee) key with a changed row are replaced,
+    including rows the transform now drops.
+
+    Args:
+        df_changes (pd.DataFrame): Raw Grammy rows updated since the last run.
+        store_path (str): Parquet file with the transformed dataset.
+
+    Returns:
+        pd.DataFrame: The full, updated transformed dataset.
+    """
+    logging.info(f"Merging {len(df_changes)} changed Grammy rows into {store_path}")
+    if df_changes.empty and os.path.exists(store_path):
+        return pd.read_parquet(store_path)
+    df_new = transform_grammy_data(df_changes.copy())
+
+    if os.path.exists(store_path):
+        df_store = pd.read_parquet(store_path)
+        changed_keys = pd.MultiIndex.from_frame(df_changes.dropna(subset=['nominee'])[GRAMMY_KEY])
+        stale = pd.MultiIndex.from_frame(df_store[GRAMMY_KEY]).isin(changed_keys)
+        df_store = pd.concat([df_store[~stale], df_new], ignore_index=True)
+    else:
+        df_store = df_new
+
+    os.makedirs(os.path.dirname(store_path), exist_ok=True)
+    tmp_path = f"{store_path}.tmp"
+    df_store.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, store_path)
+    return df_store
@@ -1,14 +1,130 @@
 """ Transform Spotify data for analysis. """
 
+import numpy as np
 import pandas as pd
 import logging
 
+from src.telemetry import instrument
+from src.transform.dedup import drop_duplicate_rows, keep_max_rows
+from src.transform.plan import TransformPlan
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
 
+GENRE_MAPPING = {
+  'Rock': ['alt-rock', 'alternative', 'grunge', 'hard-rock', 'psych-rock', 'rock', 'rock-n-roll','rockabilly', 'indie', 'garage', 'j-rock'],
+  'Metal': ['black-metal', 'death-metal', 'heavy-metal', 'metal', 'metalcore', 'grindcore','industrial'],
+  'Punk': ['punk', 'punk-rock', 'emo'],
+  'Pop': ['pop', 'power-pop', 'synth-pop', 'k-pop', 'j-pop', 'cantopop', 'mandopop','indie-pop', 'british', 'swedish'],
+  'Film/Show Music': ['pop-film', 'disney', 'show-tunes', 'anime'],
+  'Electronic': ['electronic', 'electro', 'idm', 'trip-hop'],
+  'Dance': ['dance', 'club', 'edm'],
+  'House': ['house', 'deep-house', 'chicago-house', 'progressive-house', 'detroit-techno','j-dance'],
+  'Techno': ['techno', 'minimal-techno'],
+  'Bass Music': ['dubstep', 'drum-and-bass', 'dub', 'breakbeat', 'hardstyle'],
+  'Hip-Hop': ['hip-hop', 'r-n-b'],
+  'Reggae/Dancehall': ['reggae', 'dancehall', 'reggaeton'],
+  'Jazz': ['jazz', 'groove'],
+  'Blues': ['blues', 'bluegrass', 'honky-tonk'],
+  'Soul/Funk': ['soul', 'funk', 'gospel'],
+  'Country': ['country'],
+  'Folk': ['folk', 'singer-songwriter'],
+  'Latin': ['latin', 'latino', 'salsa', 'samba', 'pagode', 'sertanejo', 'brazil', 'mpb','tango', 'spanish', 'forro'],
+  'World Music': ['afrobeat', 'indian', 'iranian', 'malay', 'turkish', 'french', 'german','world-music'],
+  'Classical': ['classical', 'opera', 'piano'],
+  'Instrumental': ['acoustic', 'guitar', 'new-age'],
+  'Ambient/Chill': ['ambient', 'chill', 'sleep', 'study'],
+  'Mood': ['happy', 'sad', 'romance'],
+  'Children': ['children', 'kids'],'Comedy/Novelty': ['comedy'],'Disco': ['disco'],'Goth': ['goth'],'Ska': ['ska'],'Party': ['party'],'J-Idol': ['j-idol']
+}
+GENRE_CATEGORY_MAPPING = {genre: category for category, genres in GENRE_MAPPING.items() for genre in genres}
+
+# Binning of the categorised features: column -> (edges, labels). Bins are
+# right-inclusive, (edges[i], edges[i + 1]], like pd.cut; values outside the
+# edges become NaN. Adding or tuning a bin only takes an entry here.
+SPOTIFY_BINS = {
+    'popularity': ([0, 30, 60, 80, 100], ['Low', 'Medium', 'High', 'Very High']),
+    'danceability': ([0, 0.3, 0.6, 1], ['Low', 'Medium', 'High']),
+    'energy': ([0, 0.3, 0.7, 1], ['Low', 'Medium', 'High']),
+    'duration_min': ([0, 2, 3.5, 5, 10, 20], ['Very Short', 'Short', 'Average', 'Long', 'Very Long']),
+    'valence': ([0, 0.2, 0.4, 0.6, 0.8, 1], ['Very Sad', 'Sad', 'Neutral', 'Happy', 'Very Happy'])
+}
+# Columns in which a null drops the row: every column the transform keeps
+# or reads. Listed explicitly so that the result does not depend on which
+# other source columns were extracted (see extract_spotify.UNUSED_COLUMNS).
+# Columns missing from the input (e.g. the 'Unnamed: 0' row number) are
+# skipped, see ``not_null_columns``.
+NOT_NULL_COLUMNS = [
+    'Unnamed: 0', 'track_id', 'artists', 'album_name', 'track_name', 'popularity', 'duration_ms',
+    'explicit', 'danceability', 'energy', 'loudness', 'liveness', 'valence', 'track_genre'
+]
+# NumPy dtypes of the nullable columns of extract_spotify.SPOTIFY_SCHEMA
+# kept by the transform, restored once their nulls are dropped.
+NOT_NULL_DTYPES = {'Unnamed: 0': 'int32', 'popularity': 'int8', 'duration_ms': 'int32', 'explicit': 'bool'}
+DROPPED_COLUMNS = ['loudness', 'liveness', 'key', 'mode', 'time_signature', 'tempo', "speechiness", "acousticness", "instrumentalness"]
+
+
+def not_null_columns(columns) -> list:
+    """Returns the columns of ``NOT_NULL_COLUMNS`` present in ``columns``."""
+    return [column for column in NOT_NULL_COLUMNS if column in columns]
+
+
+def restore_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Casts the columns of ``NOT_NULL_DTYPES`` present in ``df``, once free of nulls."""
+    return df.astype({column: dtype for column, dtype in NOT_NULL_DTYPES.items() if column in df.columns})
+
+
+def map_genre(genres: pd.Series) -> pd.Series:
+    """Maps genre names to the broader categories of ``GENRE_MAPPING``."""
+    return genres.map(GENRE_CATEGORY_MAPPING)
+
+
+def categorize(values: pd.Series, column: str, bins: dict = SPOTIFY_BINS) -> pd.Categorical:
+    """
+    Bins a feature into the ordered, labelled categories of ``bins``, with
+    the same result as ``pd.cut(values, edges, labels=labels)``.
+
+    The bin code of a value is the number of edges strictly below it minus
+    one, i.e. ``np.searchsorted(edges, values, side='left') - 1``. With a
+    handful of edges, counting them with one vectorised comparison per edge
+    is several times faster than a binary search per value. The categorical
+    is built from the codes without hashing the labels.
+
+    Args:
+        values (pd.Series): Numeric feature.
+        column (str): Entry of ``bins`` to apply.
+        bins (dict): Binning configuration, column -> (edges, labels).
+
+    Returns:
+        pd.Categorical: The categories, NaN outside the edges.
+    """
+    edges, labels = bins[column]
+    values = values.to_numpy(dtype="float64", na_value=np.nan)
+    codes = np.full(len(values), -1, dtype="int8")
+    for edge in np.asarray(edges, dtype="float64"):
+        codes += values > edge
+    codes[codes >= len(labels)] = -1
+    return pd.Categorical.from_codes(codes, dtype=pd.CategoricalDtype(labels, ordered=True), validate=False)
+
+
+def categorize_all(*columns: pd.Series, bins: dict = SPOTIFY_BINS) -> dict:
+    """
+    Bins every configured feature in one stage.
+
+    Args:
+        *columns (pd.Series): The features, in the order of ``bins``.
+        bins (dict): Binning configuration, column -> (edges, labels).
+
+    Returns:
+        dict: Categorical column per configured feature.
+    """
+    return {column: categorize(values, column, bins) for column, values in zip(bins, columns)}
+
+
+@instrument
 def delete_unnecessary_columns(df: pd.DataFrame) -> pd.DataFrame:
     """
     Delete unnecessary columns from the DataFrame.
@@ -23,9 +139,11 @@ def delete_unnecessary_columns(df: pd.DataFrame) -> pd.DataFrame:
     return df.drop(columns=['Unnamed:0'], errors='ignore')
 
 
+@instrument
 def drop_null_values(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Drop rows with null values from the DataFrame.
+    Drop rows with null values in ``NOT_NULL_COLUMNS`` from the DataFrame,
+    and cast the nullable columns of the source to ``NOT_NULL_DTYPES``.
 
     Args:
         df (pd.DataFrame): The DataFrame to modify.
@@ -34,9 +152,10 @@ def drop_null_values(df: pd.DataFrame) -> pd.DataFrame:
         pd.DataFrame: The modified DataFrame with null values dropped.
     """
     logging.info("Dropping rows with null values from the DataFrame.")
-    return df.dropna().reset_index(drop=True)
+    return restore_dtypes(df.dropna(subset=not_null_columns(df.columns))).reset_index(drop=True)
 
 
+@instrument
 def drop_duplicated_values(df: pd.DataFrame) -> pd.DataFrame:
     """
     Drop duplicated rows from the DataFrame.
@@ -48,9 +167,10 @@ def drop_duplicated_values(df: pd.DataFrame) -> pd.DataFrame:
         pd.DataFrame: The modified DataFrame with duplicated rows dropped.
     """
     logging.info("Dropping duplicated rows from the DataFrame.")
-    return df.drop_duplicates().reset_index(drop=True)
+    return drop_duplicate_rows(df).reset_index(drop=True)
 
 
+@instrument
 def drop_duplicates_id(df: pd.DataFrame) -> pd.DataFrame:
     """
     Drop duplicated rows based on the 'id' column from the DataFrame.
@@ -62,9 +182,10 @@ def drop_duplicates_id(df: pd.DataFrame) -> pd.DataFrame:
         pd.DataFrame: The modified DataFrame with duplicated rows based on 'id' dropped.
     """
     logging.info("Dropping duplicated rows based on the 'id' column from the DataFrame.")
-    return df.drop_duplicates(subset=['track_id']).reset_index(drop=True)
+    return drop_duplicate_rows(df, ['track_id']).reset_index(drop=True)
 
 
+@instrument
 def mapping_genre(df: pd.DataFrame) -> pd.DataFrame:
     """
     Map genre names into broader categories to a better use of the data.
@@ -76,37 +197,11 @@ def mapping_genre(df: pd.DataFrame) -> pd.DataFrame:
         pd.DataFrame: The modified DataFrame with mapped genre names.
     """
     logging.info("Mapping genre names in the DataFrame.")
-    genre_mapping = {
-      'Rock': ['alt-rock', 'alternative', 'grunge', 'hard-rock', 'psych-rock', 'rock', 'rock-n-roll','rockabilly', 'indie', 'garage', 'j-rock'],
-      'Metal': ['black-metal', 'death-metal', 'heavy-metal', 'metal', 'metalcore', 'grindcore','industrial'],
-      'Punk': ['punk', 'punk-rock', 'emo'],
-      'Pop': ['pop', 'power-pop', 'synth-pop', 'k-pop', 'j-pop', 'cantopop', 'mandopop','indie-pop', 'british', 'swedish'],
-      'Film/Show Music': ['pop-film', 'disney', 'show-tunes', 'anime'],
-      'Electronic': ['electronic', 'electro', 'idm', 'trip-hop'],
-      'Dance': ['dance', 'club', 'edm'],
-      'House': ['house', 'deep-house', 'chicago-house', 'progressive-house', 'detroit-techno','j-dance'],
-      'Techno': ['techno', 'minimal-techno'],
-      'Bass Music': ['dubstep', 'drum-and-bass', 'dub', 'breakbeat', 'hardstyle'],
-      'Hip-Hop': ['hip-hop', 'r-n-b'],
-      'Reggae/Dancehall': ['reggae', 'dancehall', 'reggaeton'],
-      'Jazz': ['jazz', 'groove'],
-      'Blues': ['blues', 'bluegrass', 'honky-tonk'],
-      'Soul/Funk': ['soul', 'funk', 'gospel'],
-      'Country': ['country'],
-      'Folk': ['folk', 'singer-songwriter'],
-      'Latin': ['latin', 'latino', 'salsa', 'samba', 'pagode', 'sertanejo', 'brazil', 'mpb','tango', 'spanish', 'forro'],
-      'World Music': ['afrobeat', 'indian', 'iranian', 'malay', 'turkish', 'french', 'german','world-music'],
-      'Classical': ['classical', 'opera', 'piano'],
-      'Instrumental': ['acoustic', 'guitar', 'new-age'],
-      'Ambient/Chill': ['ambient', 'chill', 'sleep', 'study'],
-      'Mood': ['happy', 'sad', 'romance'],
-      'Children': ['children', 'kids'],'Comedy/Novelty': ['comedy'],'Disco': ['disco'],'Goth': ['goth'],'Ska': ['ska'],'Party': ['party'],'J-Idol': ['j-idol']
-    }
-    genre_category_mapping = {genre: category for category, genres in genre_mapping.items() for genre in genres}
-    df["track_genre"] = df["track_genre"].map(genre_category_mapping)
+    df["track_genre"] = map_genre(df["track_genre"])
     return df.reset_index(drop=True)
 
 
+@instrument
 def drop_duplicates_by_content(df: pd.DataFrame) -> pd.DataFrame:
     """
     Drop duplicated rows ignoring the "track_name" and "artist" columns of the DataFrame.
@@ -119,9 +214,10 @@ def drop_duplicates_by_content(df: pd.DataFrame) -> pd.DataFrame:
     """
     subset_cols = [col for col in df.columns if col not in ["track_id", "album_name"]]
     logging.info("Dropping duplicated rows based on the content of the DataFrame.")
-    return df.drop_duplicates(subset=subset_cols).reset_index(drop=True)
+    return drop_duplicate_rows(df, subset_cols).reset_index(drop=True)
 
 
+@instrument
 def keep_more_popular(df: pd.DataFrame) -> pd.DataFrame:
     """
     Keep the most popular track for each artist in the DataFrame.
@@ -133,10 +229,10 @@ def keep_more_popular(df: pd.DataFrame) -> pd.DataFrame:
         pd.DataFrame: The modified DataFrame with the most popular track for each artist.
     """
     logging.info("Keeping the most popular track for each artist in the DataFrame.")
-    idx = df.groupby(['track_name', 'artists'])['popularity'].idxmax()
-    return df.loc[idx].reset_index(drop=True)
+    return keep_max_rows(df, ['track_name', 'artists'], 'popularity').reset_index(drop=True)
 
 
+@instrument
 def change_duration(df: pd.DataFrame) -> pd.DataFrame:
     """
     Change the duration of tracks in the DataFrame from milliseconds to minutes.
@@ -153,90 +249,25 @@ def change_duration(df: pd.DataFrame) -> pd.DataFrame:
     return df.reset_index(drop=True)
 
 
-def categorize_popularity(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Categorize the popularity of tracks in the DataFrame.
-
-    Args:
-        df (pd.DataFrame): The DataFrame to modify.
-
-    Returns:
-        pd.DataFrame: The modified DataFrame with categorized popularity.
-    """
-    logging.info("Categorizing the popularity of tracks in the DataFrame.")
-    bins = [0, 30, 60, 80, 100]
-    labels = ['Low', 'Medium', 'High', 'Very High']
-    df['popularity'] = pd.cut(df['popularity'], bins=bins, labels=labels)
-    return df.reset_index(drop=True)
-
-
-def categorize_danceability(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Categorize the danceability of tracks in the DataFrame.
-
-    Args:
-        df (pd.DataFrame): The DataFrame to modify.
-
-    Returns:
-        pd.DataFrame: The modified DataFrame with categorized danceability.
-    """
-    logging.info("Categorizing the danceability of tracks in the DataFrame.")
-    bins = [0, 0.3, 0.6, 1]
-    labels = ['Low', 'Medium', 'High']
-    df['danceability'] = pd.cut(df['danceability'], bins=bins, labels=labels)
-    return df.reset_index(drop=True)
-
-def categorize_energy(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Categorize the energy of tracks in the DataFrame.
-
-    Args:
-        df (pd.DataFrame): The DataFrame to modify.
-
-    Returns:
-        pd.DataFrame: The modified DataFrame with categorized energy.
-    """
-    logging.info("Categorizing the energy of tracks in the DataFrame.")
-    bins=[0, 0.3, 0.7, 1]
-    labels=['Low', 'Medium', 'High']
-    df['energy'] = pd.cut(df['energy'], bins=bins, labels=labels)
-    return df.reset_index(drop=True)
-
-
-def categorize_duration(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Categorize the duration of tracks in the DataFrame.
-
-    Args:
-        df (pd.DataFrame): The DataFrame to modify.
-
-    Returns:
-        pd.DataFrame: The modified DataFrame with categorized duration.
-    """
-    logging.info("Categorizing the duration of tracks in the DataFrame.")
-    bins=[0, 2, 3.5, 5, 10, 20]
-    labels=['Very Short', 'Short', 'Average', 'Long', 'Very Long']
-    df['duration_min'] = pd.cut(df['duration_min'], bins=bins, labels=labels)
-    return df.reset_index(drop=True)
-
-
-def categorize_valence(df: pd.DataFrame) -> pd.DataFrame:
+@instrument
+def categorize_features(df: pd.DataFrame, bins: dict = SPOTIFY_BINS) -> pd.DataFrame:
     """
-    Categorize the valence of tracks in the DataFrame.
+    Categorize every feature configured in ``bins`` in one stage.
 
     Args:
         df (pd.DataFrame): The DataFrame to modify.
+        bins (dict): Binning configuration, column -> (edges, labels).
 
     Returns:
-        pd.DataFrame: The modified DataFrame with categorized valence.
+        pd.DataFrame: The modified DataFrame with categorized features.
     """
-    logging.info("Categorizing the valence of tracks in the DataFrame.")
-    bins=[0, 0.2, 0.4, 0.6, 0.8, 1]
-    labels=['Very Sad','Sad','Neutral','Happy','Very Happy']
-    df['valence'] = pd.cut(df['valence'], bins=bins, labels=labels)
-    return df.reset_index(drop=True)
+    logging.info("Categorizing the features of tracks in the DataFrame.")
+    for column, values in categorize_all(*(df[column] for column in bins), bins=bins).items():
+        df[column] = values
+    return df
 
 
+@instrument
 def create_boolean(df: pd.DataFrame) -> pd.DataFrame:
     """
     Create boolean columns for the DataFrame.
@@ -253,6 +284,7 @@ def create_boolean(df: pd.DataFrame) -> pd.DataFrame:
     return df.reset_index(drop=True)
 
 
+@instrument
 def delete_columns(df: pd.DataFrame) -> pd.DataFrame:
     """
     Delete specified columns from the DataFrame.
@@ -264,9 +296,10 @@ def delete_columns(df: pd.DataFrame) -> pd.DataFrame:
         pd.DataFrame: The modified DataFrame with specified columns deleted.
     """
     logging.info("Deleting specified columns from the DataFrame.")
-    return df.drop(columns=['loudness', 'liveness','key', 'mode', 'time_signature', 'tempo', "speechiness", "acousticness", "instrumentalness"], errors='ignore')
+    return df.drop(columns=DROPPED_COLUMNS, errors='ignore')
 
 
+@instrument
 def transform_spotify_data(df: pd.DataFrame) -> pd.DataFrame:
     """
     Transform the Spotify data for analysis.
@@ -278,6 +311,52 @@ def transform_spotify_data(df: pd.DataFrame) -> pd.DataFrame:
         pd.DataFrame: The transformed DataFrame.
     """
     logging.info("Starting transformation of Spotify data.")
+    df = build_spotify_plan().execute(df)
+    logging.info("Transformation of Spotify data completed.")
+    return df
+
+
+def build_spotify_plan() -> TransformPlan:
+    """
+    Registers the steps of ``transform_spotify_data_stepwise`` as a lazy
+    plan. The executor merges the row filters and dedups, skips the
+    whole-row dedup (implied by the 'track_id' one that follows) and applies
+    the column derivations once on the surviving rows.
+
+    Returns:
+        TransformPlan: The Spotify transform plan.
+    """
+    return (
+        TransformPlan()
+        .drop_columns(['Unnamed:0'], name="delete_unnecessary_columns")
+        .dropna(NOT_NULL_COLUMNS, name="drop_null_values")
+        .astype(NOT_NULL_DTYPES, name="drop_null_values")
+        .drop_duplicates(name="drop_duplicated_values")
+        .drop_duplicates(['track_id'], name="drop_duplicates_id")
+        .derive('track_genre', map_genre, ['track_genre'], name="mapping_genre")
+        .drop_duplicates_except(['track_id', 'album_name'], name="drop_duplicates_by_content")
+        .keep_max(['track_name', 'artists'], 'popularity', name="keep_more_popular")
+        .derive('duration_min', lambda duration_ms: duration_ms / 60000, ['duration_ms'], name="change_duration")
+        .drop_columns(['duration_ms'], name="change_duration")
+        .derive_many(list(SPOTIFY_BINS), categorize_all, list(SPOTIFY_BINS), name="categorize_features")
+        .derive('is_loud', lambda loudness: loudness > -5, ['loudness'], name="create_boolean")
+        .derive('is_live', lambda liveness: liveness > 0.8, ['liveness'], name="create_boolean")
+        .drop_columns(DROPPED_COLUMNS, name="delete_columns")
+    )
+
+
+@instrument
+def transform_spotify_data_stepwise(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Transform the Spotify data by applying each step function in turn. This
+    is the reference implementation of ``build_spotify_plan``.
+
+    Args:
+        df (pd.DataFrame): The DataFrame to transform.
+
+    Returns:
+        pd.DataFrame: The transformed DataFrame.
+    """
     df = delete_unnecessary_columns(df)
     df = drop_null_values(df)
     df = drop_duplicated_values(df)
@@ -286,13 +365,7 @@ def transform_spotify_data(df: pd.DataFrame) -> pd.DataFrame:
     df = drop_duplicates_by_content(df)
     df = keep_more_popular(df)
     df = change_duration(df)
-    df = categorize_popularity(df)
-    df = categorize_danceability(df)
-    df = categorize_energy(df)
-    df = categorize_duration(df)
-    df = categorize_valence(df)
+    df = categorize_features(df)
     df = create_boolean(df)
     df = delete_columns(df)
-
-    logging.info("Transformation of Spotify data completed.")
-    return df.reset_index(drop=True)
\ No newline at end of file
+    return df.reset_index(drop=True)
@@ -0,0 +1,225 @@
+""" Out-of-core Spotify transform for catalogs larger than memory. """
+
+import os
+import bisect
+import shutil
+import logging
+from typing import Iterable, Iterator
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from src.storage import write_frames
+from src.telemetry import instrument, measure
+from src.transform.dedup import hash_column, combine_hashes, drop_duplicate_rows
+from src.transform.transform_spotify import build_spotify_plan, map_genre, not_null_columns, restore_dtypes
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+log = logging.getLogger(__name__)
+
+# Rows per chunk read from the source; unset (0) keeps the in-memory transform.
+SPOTIFY_CHUNKSIZE = int(os.environ.get("ETL_SPOTIFY_CHUNKSIZE", "0")) or None
+# Number of on-disk hash partitions. Each partition, about 1/N of the
+# catalog, is the largest piece held in memory by the global steps.
+SPOTIFY_PARTITIONS = int(os.environ.get("ETL_SPOTIFY_PARTITIONS", "32"))
+# Columns whose duplicates are decided by the global steps.
+TRACK_KEY = ['track_id']
+CONTENT_KEY = ['track_name', 'artists']
+ROW_COLUMN = "__row"
+# Smallest block read from each partition per merge round, so that small
+# output batches over many partitions do not make the rounds tiny.
+MIN_MERGE_BLOCK_ROWS = 4096
+
+
+class _PartitionWriter:
+    """Appends the rows of each chunk to one Arrow IPC file per hash partition."""
+
+    def __init__(self, directory: str, partitions: int):
+        os.makedirs(directory, exist_ok=True)
+        self.paths = [os.path.join(directory, f"part-{i:04d}.arrow") for i in range(partitions)]
+        self.writers = [None] * partitions
+        self.schema = None
+
+    def write(self, df: pd.DataFrame, key: list) -> None:
+        """Routes every row to the partition given by the hash of its ``key`` columns."""
+        partition = combine_hashes([hash_column(df[column]) for column in key]) % np.uint64(len(self.paths))
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self.schema is None:
+            self.schema = table.schema
+        elif not table.schema.equals(self.schema, check_metadata=False):
+            table = table.cast(self.schema)
+        for i in np.unique(partition):
+            if self.writers[i] is None:
+                self.writers[i] = pa.ipc.new_file(self.paths[i], self.schema)
+            self.writers[i].write_table(table.filter(pa.array(partition == i)))
+
+    def close(self) -> list:
+        """Closes the files and returns the paths of the non-empty partitions."""
+        for writer in self.writers:
+            if writer is not None:
+                writer.close()
+        return [path for path, writer in zip(self.paths, self.writers) if writer is not None]
+
+
+def _read_partition(path: str) -> pd.DataFrame:
+    """Reads a whole partition file."""
+    return pa.ipc.open_file(pa.memory_map(path, "r")).read_all().to_pandas()
+
+
+def _genre_dtype(genres: set):
+    """
+    Returns the dtype of 'track_genre' after the in-memory transform, where
+    the source column is a categorical of every genre in the file and the
+    dtype of the mapped column depends only on those categories.
+    """
+    categories = pd.Categorical([], categories=sorted(genres))
+    return map_genre(pd.Series(categories)).dtype
+
+
+def _merge_sorted(paths: list, by: list, batch_rows: int) -> Iterator[pd.DataFrame]:
+    """
+    Merges partition files, each sorted on ``by`` with unique keys, into
+    one sorted stream of frames. Each round reads the next block of every
+    partition whose block was used up and emits, from every partition, the
+    rows up to the smallest last key of a block that does not end its file:
+    no row still unread can sort before them. The cut in each sorted block
+    is found by bisection, and the rows are concatenated and sorted in
+    Arrow, so only a few keys per round go through Python.
+    """
+    tables = [pa.ipc.open_file(pa.memory_map(path, "r")).read_all() for path in paths]
+    keys = [[table.column(column).combine_chunks() for column in by] for table in tables]
+    block_rows = max(batch_rows // max(len(tables), 1), MIN_MERGE_BLOCK_ROWS)
+    starts = [0] * len(tables)
+    ends = [0] * len(tables)
+    sort_keys = [(column, "ascending") for column in by]
+
+    def key(i: int, row: int) -> tuple:
+        return tuple(column[row].as_py() for column in keys[i])
+
+    while True:
+        bounds = []
+        for i, table in enumerate(tables):
+            if starts[i] == ends[i]:
+                ends[i] = min(starts[i] + block_rows, table.num_rows)
+            if ends[i] < table.num_rows:
+                bounds.append(key(i, ends[i] - 1))
+        if all(start == table.num_rows for start, table in zip(starts, tables)):
+            return
+
+        # With every partition read to its end, all the pending rows go out.
+        bound = min(bounds) if bounds else None
+        pieces = []
+        for i, table in enumerate(tables):
+            end = ends[i]
+            if bound is not None:
+                end = bisect.bisect_right(range(starts[i], ends[i]), bound, key=lambda row: key(i, row)) + starts[i]
+            if end > starts[i]:
+                pieces.append(table.slice(starts[i], end - starts[i]))
+                starts[i] = end
+        merged = pa.concat_tables(pieces).unify_dictionaries()
+        yield merged.take(pc.sort_indices(merged, sort_keys=sort_keys)).to_pandas()
+
+
+@instrument
+def transform_spotify_data_chunked(
+    chunks: Iterable[pd.DataFrame],
+    output_path: str,
+    work_dir: str,
+    partitions: int = SPOTIFY_PARTITIONS,
+    batch_rows: int = 100_000
+) -> int:
+    """
+    Transforms the Spotify data chunk by chunk, with the same result as
+    ``transform_spotify_data`` on the whole catalog, holding at most a
+    chunk or one hash partition in memory:
+
+    1. Each chunk drops its rows with nulls and is hash-partitioned to disk
+       on 'track_id', keeping the row numbers of the source.
+    2. Each 'track_id' partition keeps the first row of every id, and the
+       survivors are partitioned again on ('track_name', 'artists'), which
+       every content duplicate and every popularity group share.
+    3. Each of these partitions, back in source order, runs the in-memory
+       plan: content dedup, most popular track, row-local derivations.
+    4. The partition results, each sorted on ('track_name', 'artists'), are
+       merged into the output, which is written batch by batch.
+
+    Args:
+        chunks (Iterable[pd.DataFrame]): Raw Spotify data in source order.
+        output_path (str): Artifact path of the result (see src.storage).
+        work_dir (str): Directory for the partition files, removed at the end.
+        partitions (int): Number of hash partitions.
+        batch_rows (int): Rows per output batch.
+
+    Returns:
+        int: Number of output rows.
+    """
+    spill_dir = os.path.join(work_dir, "spotify_partitions")
+    shutil.rmtree(spill_dir, ignore_errors=True)
+    genres = set()
+    empty = None
+    try:
+        with measure("partition_by_track_id") as record:
+            by_track = _PartitionWriter(os.path.join(spill_dir, "track"), partitions)
+            offset = 0
+            for chunk in chunks:
+                if empty is None:
+                    empty = chunk.head(0)
+                chunk = chunk.reset_index(drop=True)
+                chunk.insert(0, ROW_COLUMN, np.arange(offset, offset + len(chunk), dtype="int64"))
+                offset += len(chunk)
+                genres.update(chunk['track_genre'].dropna().unique())
+                # Chunks have their own genre categories; plain strings
+                # share one schema across partition files.
+                chunk['track_genre'] = chunk['track_genre'].astype(object)
+                chunk = restore_dtypes(chunk.dropna(subset=not_null_columns(chunk.columns)))
+                if len(chunk):
+                    by_track.write(chunk, TRACK_KEY)
+            track_paths = by_track.close()
+            if record is not None:
+                record["rows_in"] = offset
+
+        if empty is None:
+            raise ValueError("No Spotify chunks to transform.")
+
+        with measure("partition_by_content"):
+            by_content = _PartitionWriter(os.path.join(spill_dir, "content"), partitions)
+            for path in track_paths:
+                by_content.write(drop_duplicate_rows(_read_partition(path), TRACK_KEY), CONTENT_KEY)
+            content_paths = by_content.close()
+
+        with measure("transform_partitions"):
+            plan = build_spotify_plan()
+            result_dir = os.path.join(spill_dir, "result")
+            os.makedirs(result_dir, exist_ok=True)
+            result_paths = []
+            for i, path in enumerate(content_paths):
+                df = _read_partition(path).sort_values(ROW_COLUMN, kind="stable")
+                df = plan.execute(df.drop(columns=[ROW_COLUMN]).reset_index(drop=True))
+                if len(df):
+                    result_paths.append(write_frames([df], os.path.join(result_dir, f"part-{i:04d}.arrow")))
+
+        genre_dtype = _genre_dtype(genres)
+
+        def batches() -> Iterator[pd.DataFrame]:
+            if not result_paths:
+                yield plan.execute(empty)
+            for df in _merge_sorted(result_paths, CONTENT_KEY, batch_rows):
+                df['track_genre'] = df['track_genre'].astype(genre_dtype)
+                yield df
+
+        rows = 0
+        with measure("merge_partitions") as record:
+            def counted(frames: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+                nonlocal rows
+                for df in frames:
+                    rows += len(df)
+                    yield df
+            write_frames(counted(batches()), output_path)
+            if record is not None:
+                record["rows_out"] = rows
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+    log.info(f"Transformed {offset} Spotify rows in chunks into {rows} rows")
+    return rows
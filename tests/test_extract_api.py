@@ -0,0 +1,95 @@
+""" Failure isolation of the Wikidata extract against the local SPARQL stub. """
+
+import os
+import socket
+import sys
+import time
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.sparql_stub import StubState, start_stub_server
+from src.extract import extract_api
+from src.extract.wikidata_cache import get_quarantined, open_cache, put_cached
+
+ARTISTS = [f"artist {i}" for i in range(40)]
+POISON = "artist 13"
+
+
+def make_fixture() -> dict:
+    """Builds one Wikidata row per artist."""
+    return {
+        name: [{"artist": name, "country": "Colombia", "award": "No awards", "gender": "female", "album_count": "2"}]
+        for name in ARTISTS
+    }
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    state = StubState(make_fixture(), poison_names={POISON})
+    server = start_stub_server(state)
+    monkeypatch.setattr(extract_api, "WIKIDATA_ENDPOINT", f"http://127.0.0.1:{server.server_port}/sparql")
+    monkeypatch.setattr(extract_api, "MAX_RETRIES", 1)
+    monkeypatch.setattr(extract_api, "BACKOFF_SECONDS", 0.0)
+    yield state
+    server.shutdown()
+
+
+def extract(cache_path: str, **kwargs) -> list:
+    """Runs the fetch engine over ``ARTISTS`` and returns every row."""
+    return [
+        row
+        for _, rows in extract_api._query_wikidata(
+            ARTISTS, max_workers=2, requests_per_second=1000.0, cache_path=cache_path,
+            batch_size=10, **kwargs
+        )
+        for row in rows
+    ]
+
+
+@pytest.mark.parametrize("isolation", sorted(extract_api.ISOLATION_MODES))
+def test_poison_name_is_quarantined(stub, tmp_path, isolation):
+    cache_path = str(tmp_path / "cache.sqlite")
+    stats = {}
+    rows = extract(cache_path, isolation=isolation, stats=stats)
+
+    assert sorted(row["artist"] for row in rows) == sorted(set(ARTISTS) - {POISON})
+    assert stats["quarantined"] == 1
+    conn = open_cache(cache_path)
+    assert get_quarantined(conn, ARTISTS) == {POISON}
+    conn.close()
+
+
+def test_quarantined_name_keeps_its_expired_rows(stub, tmp_path):
+    cache_path = str(tmp_path / "cache.sqlite")
+    conn = open_cache(cache_path)
+    put_cached(conn, {POISON: make_fixture()[POISON]}, fetched_at=time.time() - 400 * 86400)
+    conn.close()
+
+    rows = extract(cache_path, cache_ttl_days=30)
+    assert POISON in {row["artist"] for row in rows}
+
+    # Quarantined on the second run too: still served from the expired entry.
+    rows = extract(cache_path, cache_ttl_days=30)
+    assert POISON in {row["artist"] for row in rows}
+
+
+@pytest.mark.parametrize("isolation", sorted(extract_api.ISOLATION_MODES))
+def test_outage_fails_without_quarantine(stub, tmp_path, isolation):
+    stub.outage_status = 502
+    cache_path = str(tmp_path / "cache.sqlite")
+    with pytest.raises(extract_api.WikidataUnavailable):
+        extract(cache_path, isolation=isolation)
+
+    conn = open_cache(cache_path)
+    assert get_quarantined(conn, ARTISTS) == set()
+    conn.close()
+
+
+def test_unreachable_endpoint_fails(monkeypatch, tmp_path):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    monkeypatch.setattr(extract_api, "WIKIDATA_ENDPOINT", f"http://127.0.0.1:{port}/sparql")
+    with pytest.raises(extract_api.WikidataUnavailable):
+        extract(str(tmp_path / "cache.sqlite"))
@@ -0,0 +1,101 @@
+""" Spotify transforms on sources without the 'Unnamed: 0' row number or with nulls. """
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.extract import extract_spotify
+from src.storage import read_frame
+from src.transform import transform_spotify
+from src.transform.transform_spotify_chunked import transform_spotify_data_chunked
+
+
+def make_catalog(rows: int = 600, seed: int = 0) -> pd.DataFrame:
+    """Builds a small Spotify catalog with nulls, repeated ids and content duplicates."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'track_id': [f"id{i}" for i in rng.integers(0, rows // 2, rows)],
+        'artists': rng.choice(['Adele', 'Coldplay', 'Shakira', 'Daft Punk'], rows),
+        'album_name': rng.choice(['a', 'b', 'c'], rows),
+        'track_name': rng.choice([f"song {i}" for i in range(40)], rows),
+        'popularity': rng.integers(0, 101, rows),
+        'duration_ms': rng.integers(20000, 1300000, rows),
+        'explicit': rng.choice([True, False], rows),
+        'danceability': rng.choice([0.0, 0.3, 0.5, 1.0], rows),
+        'energy': rng.random(rows),
+        'key': rng.integers(0, 12, rows),
+        'loudness': rng.normal(-7, 3, rows),
+        'mode': rng.integers(0, 2, rows),
+        'speechiness': rng.random(rows),
+        'acousticness': rng.random(rows),
+        'instrumentalness': rng.random(rows),
+        'liveness': rng.random(rows),
+        'valence': rng.choice([0.0, 0.2, 0.55, 1.0], rows),
+        'tempo': rng.random(rows) * 200,
+        'time_signature': rng.integers(3, 6, rows),
+        'track_genre': rng.choice(['rock', 'pop', 'jazz', 'sleep', 'unknown-genre'], rows)
+    })
+    # Same content under another id and album: dropped by the content dedup.
+    copies = df.sample(60, random_state=seed).assign(track_id=lambda d: d['track_id'] + "x", album_name="z")
+    df = pd.concat([df, copies], ignore_index=True)
+    df.loc[[3, 7], 'artists'] = np.nan
+    return df
+
+
+@pytest.fixture
+def source_without_row_number(tmp_path, monkeypatch):
+    csv_path = tmp_path / "spotify_dataset.csv"
+    make_catalog().to_csv(csv_path, index=False)
+    monkeypatch.setattr(extract_spotify, "SPOTIFY_CSV", str(csv_path))
+    return csv_path
+
+
+def test_transforms_without_row_number(source_without_row_number, tmp_path):
+    df = extract_spotify.extract_spotify_data()
+    assert 'Unnamed: 0' not in df.columns
+    # Without the row number the content dedup depends on every column.
+    assert set(extract_spotify.UNUSED_COLUMNS) <= set(df.columns)
+
+    planned = transform_spotify.transform_spotify_data(df.copy())
+    stepwise = transform_spotify.transform_spotify_data_stepwise(df.copy())
+    pd.testing.assert_frame_equal(planned, stepwise)
+
+    output_path = str(tmp_path / "spotify.arrow")
+    rows = transform_spotify_data_chunked(
+        extract_spotify.extract_spotify_data(chunksize=100), output_path, str(tmp_path), partitions=4
+    )
+    assert rows == len(planned)
+    pd.testing.assert_frame_equal(planned, read_frame(output_path))
+
+    assert planned['artists'].notna().all()
+    assert not planned.duplicated(['track_name', 'artists']).any()
+
+
+def test_drop_null_values_without_row_number():
+    df = make_catalog()
+    out = transform_spotify.drop_null_values(df)
+    assert len(out) == len(df) - 2
+
+
+def test_nulls_in_integer_and_boolean_columns(tmp_path, monkeypatch):
+    df = make_catalog()
+    df.insert(0, 'Unnamed: 0', np.arange(len(df)))
+    for column, rows in {'popularity': [1, 2], 'duration_ms': [5], 'explicit': [8, 9]}.items():
+        df[column] = df[column].astype(object)
+        df.loc[rows, column] = np.nan
+    csv_path = tmp_path / "spotify_dataset.csv"
+    df.to_csv(csv_path, index=False)
+    monkeypatch.setattr(extract_spotify, "SPOTIFY_CSV", str(csv_path))
+
+    raw = extract_spotify.extract_spotify_data()
+    assert raw['popularity'].isna().sum() == 2
+
+    planned = transform_spotify.transform_spotify_data(raw.copy())
+    pd.testing.assert_frame_equal(planned, transform_spotify.transform_spotify_data_stepwise(raw.copy()))
+    assert planned['explicit'].dtype == bool
+    assert planned['Unnamed: 0'].dtype == 'int32'
+    assert not planned['Unnamed: 0'].isin([1, 2, 3, 5, 7, 8, 9]).any()